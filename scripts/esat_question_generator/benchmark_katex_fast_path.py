@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measure how often KaTeX validation takes the plain-text fast path.
+
+Reads the question packages saved under runs/*/accepted.jsonl (and
+rejected.jsonl) and reports, per field, how many texts skip lint/render
+because they contain no $ delimiters or LaTeX commands, plus the time
+spent on lint-only validation with and without the cache warmed.
+
+Usage:
+    python benchmark_katex_fast_path.py [runs_glob]
+"""
+
+import glob
+import json
+import sys
+import time
+from collections import Counter
+
+from katex_validator import _is_plain_text, clear_katex_caches, validate_question_package
+
+
+def _load_packages(pattern: str):
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                package = record.get("question_package")
+                if isinstance(package, dict):
+                    yield package
+
+
+def _field_texts(package: dict):
+    question = package.get("question") or {}
+    solution = package.get("solution") or {}
+    if question.get("stem"):
+        yield "stem", question["stem"]
+    for opt_text in (question.get("options") or {}).values():
+        if opt_text:
+            yield "option", str(opt_text)
+    for key in ("reasoning", "key_insight"):
+        if solution.get(key):
+            yield key, solution[key]
+
+
+def main() -> None:
+    pattern = sys.argv[1] if len(sys.argv) > 1 else "runs/*/*.jsonl"
+    packages = list(_load_packages(pattern))
+    if not packages:
+        print(f"No question packages found in {pattern}")
+        return
+
+    totals: Counter = Counter()
+    plain: Counter = Counter()
+    for package in packages:
+        for field, text in _field_texts(package):
+            totals[field] += 1
+            if _is_plain_text(text):
+                plain[field] += 1
+
+    print(f"Question packages: {len(packages)}")
+    print("Plain-text fast path hits:")
+    for field in totals:
+        print(f"  {field:12s} {plain[field]:6d} / {totals[field]:6d} ({100 * plain[field] / totals[field]:.1f}%)")
+    all_plain, all_total = sum(plain.values()), sum(totals.values())
+    print(f"  {'total':12s} {all_plain:6d} / {all_total:6d} ({100 * all_plain / all_total:.1f}%)")
+
+    clear_katex_caches()
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        for package in packages:
+            validate_question_package(package, skip_render_test=True)
+        elapsed = time.perf_counter() - start
+        print(f"Lint-only validation ({label} cache): {elapsed * 1000:.1f} ms "
+              f"({elapsed * 1e6 / len(packages):.0f} us/package)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,62 +4,137 @@
 import json
 import os
 import glob
+import queue
+import threading
 from show_last_question import create_html_viewer
 
-def generate_html_for_all_questions():
-    """Generate HTML files for all accepted questions"""
-    
-    # Find all accepted.jsonl files
-    accepted_files = glob.glob("runs/*/accepted.jsonl")
-    
-    if not accepted_files:
-        print("No accepted questions found.")
-        return
-    
-    total_questions = 0
-    total_html = 0
-    
+# Bounded queue depth between pipeline stages (caps peak memory)
+QUEUE_MAXSIZE = 256
+# Number of renderer threads. create_html_viewer is pure-Python (GIL-bound), so more
+# threads wouldn't render any faster; one keeps the output in file order
+RENDER_WORKERS = 1
+
+# Shutdown marker passed through the queues
+_SENTINEL = None
+
+
+def _read_accepted(accepted_files, render_q, stats):
+    """Reader stage: stream accepted.jsonl lines into the render queue.
+
+    Items are (run_dir, line_num, html_path, data, error); progress and errors
+    are printed by the writer stage, so the output stays in order.
+    """
     for accepted_file in accepted_files:
         run_dir = os.path.dirname(accepted_file)
-        print(f"\nProcessing: {run_dir}")
-        
-        # Read all questions from this run
+
         with open(accepted_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        for line_num, line in enumerate(lines, 1):
-            if not line.strip():
-                continue
-            
-            try:
-                data = json.loads(line)
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+
+                stats["total_questions"] += 1
+                try:
+                    data = json.loads(line)
+                except Exception as e:
+                    render_q.put((run_dir, line_num, None, None, e))
+                    continue
+
                 question_id = data.get('id', f'question_{line_num}')
                 html_filename = f"{question_id}.html"
                 html_path = os.path.join(run_dir, html_filename)
-                
-                # Generate HTML
-                html_content = create_html_viewer(data)
-                
-                # Save HTML file
-                with open(html_path, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                
-                total_html += 1
-                print(f"  [OK] Generated: {html_filename}")
-                
+                render_q.put((run_dir, line_num, html_path, data, None))
+
+
+def _render_worker(render_q, write_q):
+    """Renderer stage: turn question dicts into encoded HTML."""
+    while True:
+        item = render_q.get()
+        if item is _SENTINEL:
+            break
+
+        run_dir, line_num, html_path, data, error = item
+        payload = None
+        if error is None:
+            try:
+                payload = create_html_viewer(data).encode('utf-8')
             except Exception as e:
-                print(f"  [ERROR] Error processing line {line_num}: {e}")
-            
-            total_questions += 1
-    
+                error = e
+        write_q.put((run_dir, line_num, html_path, payload, error))
+
+
+def _write_html(write_q, stats):
+    """Writer stage: drain rendered HTML to disk and print progress."""
+    current_run_dir = None
+    while True:
+        item = write_q.get()
+        if item is _SENTINEL:
+            break
+
+        run_dir, line_num, html_path, payload, error = item
+        if run_dir != current_run_dir:
+            current_run_dir = run_dir
+            print(f"\nProcessing: {run_dir}")
+        if error is None:
+            try:
+                with open(html_path, 'wb') as f:
+                    f.write(payload)
+            except Exception as e:
+                error = e
+        if error is not None:
+            print(f"  [ERROR] Error processing line {line_num}: {error}")
+            continue
+
+        stats["total_html"] += 1
+        print(f"  [OK] Generated: {os.path.basename(html_path)}")
+
+
+def generate_html_for_all_questions():
+    """Generate HTML files for all accepted questions
+
+    Runs as a streaming pipeline (reader -> renderers -> writer) connected by
+    bounded queues, so disk I/O overlaps with rendering and peak memory is
+    bounded by the queue depth rather than the size of the runs.
+    """
+
+    # Find all accepted.jsonl files
+    accepted_files = glob.glob("runs/*/accepted.jsonl")
+
+    if not accepted_files:
+        print("No accepted questions found.")
+        return
+
+    stats = {"total_questions": 0, "total_html": 0}
+    render_q = queue.Queue(maxsize=QUEUE_MAXSIZE)
+    write_q = queue.Queue(maxsize=QUEUE_MAXSIZE)
+
+    renderers = [
+        threading.Thread(target=_render_worker, args=(render_q, write_q), daemon=True)
+        for _ in range(RENDER_WORKERS)
+    ]
+    writer = threading.Thread(target=_write_html, args=(write_q, stats), daemon=True)
+
+    for t in renderers:
+        t.start()
+    writer.start()
+
+    try:
+        _read_accepted(accepted_files, render_q, stats)
+    finally:
+        # Drain renderers first, then the writer
+        for _ in renderers:
+            render_q.put(_SENTINEL)
+        for t in renderers:
+            t.join()
+        write_q.put(_SENTINEL)
+        writer.join()
+
     print(f"\n{'='*60}")
     print(f"Summary:")
-    print(f"  Total questions processed: {total_questions}")
-    print(f"  HTML files generated: {total_html}")
+    print(f"  Total questions processed: {stats['total_questions']}")
+    print(f"  HTML files generated: {stats['total_html']}")
     print(f"{'='*60}")
     print(f"\nHTML files are saved in their respective run directories:")
     print(f"  runs/<timestamp>/<question_id>.html")
 
 if __name__ == "__main__":
     generate_html_for_all_questions()
-
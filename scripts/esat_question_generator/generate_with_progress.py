@@ -8,6 +8,7 @@ to a file that can be read by the web UI.
 """
 
 import os
+import re
 import sys
 import time
 import json
@@ -31,11 +32,17 @@ if sys.platform == "win32":
 # Status file path (relative to script directory)
 STATUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".generation_status.json")
 
+# Matches an uncommented GEMINI_API_KEY line in a .env file (quoted or bare value,
+# optionally followed by a " # comment")
+_KEY_RE = re.compile(rb'^\s*GEMINI_API_KEY\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s#]+))(?:\s+#.*)?\s*$', re.M)
+
 def write_status(status: dict):
     """Write status to JSON file for web UI to read."""
     try:
+        # Serialize first, then write once (json.dump issues a write per token)
+        text = json.dumps(status, indent=2)
         with open(STATUS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(status, f, indent=2)
+            f.write(text)
     except Exception as e:
         # Don't fail generation if status write fails
         print(f"Warning: Could not write status file: {e}", file=sys.stderr)
@@ -74,12 +81,8 @@ def main():
     if not os.path.exists(env_path):
         env_path = os.path.join(base_dir, ".env.local")
     
-    # Load environment
+    # Load environment (env_path already falls back to base_dir/.env.local above)
     safe_load_dotenv(env_path)
-    
-    # Also try loading from base_dir if not found
-    if not os.path.exists(env_path):
-        safe_load_dotenv(os.path.join(base_dir, ".env.local"))
 
     # Validate API key before starting
     # Check multiple sources for the API key
@@ -90,13 +93,12 @@ def main():
         # Also check if it's in the loaded .env file
         if os.path.exists(env_path):
             try:
-                with open(env_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if line.strip().startswith('GEMINI_API_KEY=') and not line.strip().startswith('#'):
-                            api_key = line.split('=', 1)[1].strip().strip('"').strip("'")
-                            # Also set it in os.environ for this process
-                            os.environ['GEMINI_API_KEY'] = api_key
-                            break
+                with open(env_path, 'rb') as f:
+                    match = _KEY_RE.search(f.read())
+                if match:
+                    api_key = next((g for g in match.groups() if g is not None), b'').decode('utf-8').strip()
+                    # Also set it in os.environ for this process
+                    os.environ['GEMINI_API_KEY'] = api_key
             except Exception:
                 pass
     
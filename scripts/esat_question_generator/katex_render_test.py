@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+KaTeX Render Test
+
+Finds the math in a text with the same rules the app uses to render it
+(parseMathContent in src/hooks/useKaTeX.ts) and renders every expression with
+KaTeX in Node.js.
+
+Rendering goes through a single long-lived `node katex_worker.js` child process,
+spoken to with line-delimited JSON over stdin/stdout, so Node.js + KaTeX startup
+is paid once per Python process instead of once per render test. The worker's
+stderr is passed through to ours.
+
+Results:
+    {"ok": True}
+    {"ok": False, "type": "inline"|"display", "startLine": int,
+     "content": str, "katexError": str}
+"""
+
+import atexit
+import collections
+import json
+import os
+import subprocess
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "katex_worker.js")
+
+# Lines of worker stderr kept for error messages
+_STDERR_TAIL_LINES = 20
+
+
+def _find_dollar(text: str, start: int) -> int:
+    """Index of the next $ at or after start that is not escaped as \\$ (-1 if none)."""
+    i = text.find('$', start)
+    while i != -1:
+        backslashes = 0
+        j = i - 1
+        while j >= 0 and text[j] == '\\':
+            backslashes += 1
+            j -= 1
+        if backslashes % 2 == 0:
+            return i
+        i = text.find('$', i + 1)
+    return -1
+
+
+def _find_double_dollar(text: str, start: int) -> int:
+    """Index of the next unescaped $$ at or after start (-1 if none)."""
+    i = _find_dollar(text, start)
+    while i != -1 and text[i + 1:i + 2] != '$':
+        i = _find_dollar(text, i + 1)
+    return i
+
+
+def extract_math_segments(text: str) -> List[Tuple[bool, str, int]]:
+    """
+    Math expressions in text as (display, content, start_line) tuples.
+
+    Same rules as the app's parseMathContent: $$...$$ is display math, $...$ is
+    inline math (either may span lines), and an unmatched delimiter is plain
+    text. An escaped \\$ is a literal dollar, as in the linter.
+    """
+    segments: List[Tuple[bool, str, int]] = []
+    i = 0
+    while True:
+        start = _find_dollar(text, i)
+        if start == -1:
+            break
+        if text[start + 1:start + 2] == '$':
+            end = _find_double_dollar(text, start + 2)
+            if end == -1:
+                # Unmatched $$, treat as text
+                i = start + 2
+                continue
+            segments.append((True, text[start + 2:end], text.count('\n', 0, start) + 1))
+            i = end + 2
+        else:
+            end = _find_dollar(text, start + 1)
+            if end == -1 or text[end + 1:end + 2] == '$':
+                # Unmatched $ (or one closed by a display $$), treat as text
+                i = start + 1
+                continue
+            segments.append((False, text[start + 1:end], text.count('\n', 0, start) + 1))
+            i = end + 1
+    return segments
+
+
+class KatexRenderWorker:
+    """Lazily spawned Node.js KaTeX worker (thread-safe, one request in flight)."""
+
+    def __init__(self, script_path: str = _WORKER_SCRIPT, node_cmd: Optional[str] = None):
+        self.script_path = script_path
+        self.node_cmd = node_cmd or os.environ.get("NODE_BINARY", "node")
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._stderr_tail: collections.deque = collections.deque(maxlen=_STDERR_TAIL_LINES)
+        self._stderr_thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self._stderr_tail.clear()
+            self._proc = subprocess.Popen(
+                [self.node_cmd, self.script_path],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+                cwd=os.path.dirname(self.script_path),
+            )
+            self._stderr_thread = threading.Thread(target=self._pump_stderr, args=(self._proc.stderr,),
+                                                   name="katex-worker-stderr", daemon=True)
+            self._stderr_thread.start()
+        return self._proc
+
+    def _pump_stderr(self, stream) -> None:
+        """Pass the worker's stderr through to ours, keeping the last lines for errors."""
+        for line in stream:
+            self._stderr_tail.append(line.rstrip("\n"))
+            sys.stderr.write(f"[katex_worker] {line}")
+        stream.close()
+
+    def _failure(self, message: str) -> RuntimeError:
+        self._terminate()
+        if self._stderr_thread is not None:
+            # Let the pump read what the exited process wrote last
+            self._stderr_thread.join(timeout=1)
+        if self._stderr_tail:
+            message += "\nWorker stderr:\n" + "\n".join(self._stderr_tail)
+        return RuntimeError(message)
+
+    def render_batch(self, texts: List[str]) -> List[Dict]:
+        """Render-test several texts in one round-trip. Returns one result per text."""
+        if not texts:
+            return []
+
+        items = [
+            [{"display": display, "content": content, "startLine": line}
+             for display, content, line in extract_math_segments(text)]
+            for text in texts
+        ]
+        with self._lock:
+            proc = self._ensure_started()
+            self._next_id += 1
+            request_id = self._next_id
+            try:
+                proc.stdin.write(json.dumps({"id": request_id, "items": items}) + "\n")
+                proc.stdin.flush()
+                line = proc.stdout.readline()
+            except OSError as e:
+                raise self._failure(f"KaTeX render worker failed: {e}") from e
+
+            if not line:
+                raise self._failure(
+                    "KaTeX render worker exited (is Node.js with the katex package installed?)"
+                )
+
+            response = json.loads(line)
+            if response.get("id") != request_id or "results" not in response:
+                raise self._failure(f"KaTeX render worker returned an unexpected response: {line[:200]}")
+            return response["results"]
+
+    def render(self, text: str) -> Dict:
+        """Render-test a single text."""
+        return self.render_batch([text])[0]
+
+    def _terminate(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+            proc.wait(timeout=2)
+        except Exception:
+            proc.kill()
+        finally:
+            if proc.stdout:
+                proc.stdout.close()
+
+    def close(self) -> None:
+        """Shut the Node.js process down (safe to call more than once)."""
+        with self._lock:
+            self._terminate()
+
+
+_WORKER = KatexRenderWorker()
+atexit.register(_WORKER.close)
+
+
+def run_render_test(text: str) -> Dict:
+    """Render-test text with the shared persistent worker."""
+    return _WORKER.render(text)
+
+
+def run_render_test_batch(texts: List[str]) -> List[Dict]:
+    """Render-test several texts with the shared persistent worker in one round-trip."""
+    return _WORKER.render_batch(texts)
@@ -10,11 +10,159 @@ Uses a two-stage approach:
 2. Node.js render test (actual KaTeX rendering)
 """
 
+import hashlib
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
 
 from katex_linter import lint_katex, format_lint_errors
-from katex_render_test import run_render_test
+
+# Render tests go through a persistent Node.js worker, so KaTeX is loaded once per process
+from katex_render_test import run_render_test_batch
+
+
+# Delimiter/spacing patterns used by normalize_katex_formatting (compiled once)
+_RE_LPAREN = re.compile(r'\\\(')
+_RE_RPAREN = re.compile(r'\\\)')
+_RE_LBRACK = re.compile(r'\\\[')
+_RE_RBRACK = re.compile(r'\\\]')
+_RE_DOLLAR_LEAD = re.compile(r'\$\s+')
+_RE_DOLLAR_TRAIL = re.compile(r'\s+\$')
+
+
+# Content-addressed result cache (per process, FIFO-evicted once full):
+# text digest -> {"lint": {subject: formatted lint errors}, "render_ok": bool}
+# Render failures are never cached - a failed render may be a flaky Node.js
+# environment rather than bad content.
+_CACHE_MAX_ENTRIES = 100_000
+_CACHE: Dict[bytes, Dict] = {}
+_RENDER_OK_RESULT = {"ok": True}
+# Guards _CACHE and _cache_stats (validation runs on several threads)
+_cache_lock = threading.Lock()
+_cache_stats = {"lint_hits": 0, "lint_misses": 0, "render_hits": 0, "render_misses": 0}
+
+# Runs render test batches (Node.js I/O) while the calling thread lints. One
+# thread is enough: the single Node.js worker takes one request at a time.
+_RENDER_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="katex-render")
+
+
+def _cache_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def _cache_entry(key: bytes) -> Dict:
+    """The cache entry for key, created if missing. Call with _cache_lock held."""
+    entry = _CACHE.get(key)
+    if entry is None:
+        if len(_CACHE) >= _CACHE_MAX_ENTRIES:
+            # Dicts keep insertion order, so the first key is the oldest entry
+            _CACHE.pop(next(iter(_CACHE)), None)
+        entry = _CACHE[key] = {"lint": {}, "render_ok": False}
+    return entry
+
+
+def clear_katex_caches() -> None:
+    """Drop all cached lint and render results."""
+    with _cache_lock:
+        _CACHE.clear()
+        for name in _cache_stats:
+            _cache_stats[name] = 0
+
+
+def katex_cache_stats() -> Dict[str, int]:
+    """Return the cache size and hit/miss counters."""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats["entries"] = len(_CACHE)
+    return stats
+
+
+def _is_plain_text(text: str) -> bool:
+    """True if text has nothing to lint or render.
+    
+    That is text shorter than 3 characters (too short for a $...$ pair with
+    content, e.g. option labels like "A") or text with no $ delimiters or
+    LaTeX commands.
+    """
+    return len(text) < 3 or not ('$' in text or '\\' in text)
+
+
+_RENDER_ERROR_TMPL = "{et} math render error at line {sl}: {ke} (content: {cp})"
+_ERROR_TYPE_LABELS = {"inline": "Inline", "display": "Display", "unknown": "Unknown"}
+
+
+def _format_render_error(render_result: Dict) -> str:
+    """Format a failed Node.js render test result as an error string."""
+    error_type = render_result.get("type", "unknown")
+    start_line = render_result.get("startLine", 0)
+    content = render_result.get("content", "")
+    katex_error = render_result.get("katexError", "Unknown error")
+    
+    # Truncate long content
+    if len(content) > 50:
+        content_preview = content[:50] + "..."
+    else:
+        content_preview = content
+    
+    return _RENDER_ERROR_TMPL.format(
+        et=_ERROR_TYPE_LABELS.get(error_type) or error_type.capitalize(),
+        sl=start_line,
+        ke=katex_error,
+        cp=content_preview,
+    )
+
+
+def _run_render_tests(texts: List[str]) -> List[Dict]:
+    """Run the Node.js render test on several texts in one call.
+    
+    Texts that already rendered successfully in this process skip Node.js.
+    """
+    keys = [_cache_key(text) for text in texts]
+    with _cache_lock:
+        results: List[Optional[Dict]] = []
+        for key in keys:
+            entry = _CACHE.get(key)
+            results.append(dict(_RENDER_OK_RESULT) if entry and entry["render_ok"] else None)
+        missing = [idx for idx, result in enumerate(results) if result is None]
+        _cache_stats["render_hits"] += len(texts) - len(missing)
+        _cache_stats["render_misses"] += len(missing)
+    
+    if missing:
+        missing_texts = [texts[idx] for idx in missing]
+        fresh = run_render_test_batch(missing_texts)
+        with _cache_lock:
+            for idx, result in zip(missing, fresh):
+                results[idx] = result
+                if result.get("ok", False):
+                    _cache_entry(keys[idx])["render_ok"] = True
+    
+    return results
+
+
+def _lint_errors(text: str, subject: Optional[str]) -> List[str]:
+    """Formatted lint errors for text (empty if it passes lint), memoized per process."""
+    key = _cache_key(text)
+    with _cache_lock:
+        entry = _CACHE.get(key)
+        cached = entry["lint"].get(subject) if entry else None
+        if cached is not None:
+            _cache_stats["lint_hits"] += 1
+            return list(cached)
+        _cache_stats["lint_misses"] += 1
+    
+    lint_errors = lint_katex(text, subject=subject)
+    errors = format_lint_errors(lint_errors) if lint_errors else []
+    with _cache_lock:
+        _cache_entry(key)["lint"][subject] = tuple(errors)
+    return errors
+
+
+def _warn_render_test_unavailable(e: Exception) -> None:
+    # If render test fails to run (Node.js not available, etc.), log but don't fail
+    # This allows the system to work even if Node.js is not set up
+    import warnings
+    warnings.warn(f"KaTeX render test failed (may not be set up): {e}")
 
 
 def validate_katex_formatting(text: str, skip_render_test: bool = False, subject: Optional[str] = None) -> Tuple[bool, List[str]]:
@@ -30,45 +178,29 @@ def validate_katex_formatting(text: str, skip_render_test: bool = False, subject
         
     Returns:
         Tuple of (is_valid, list_of_errors)
+    
+    Texts shorter than 3 characters, and texts without $ or backslashes, are
+    always valid: they cannot contain a $...$ pair with content.
     """
-    errors: List[str] = []
+    # Short or plain text (no $ delimiters or LaTeX commands) has nothing to lint or render
+    if _is_plain_text(text):
+        return True, []
     
-    # Stage 1: Run deterministic linter (fast)
-    lint_errors = lint_katex(text, subject=subject)
+    # Stage 1: Run deterministic linter (fast, cached)
+    lint_errors = _lint_errors(text, subject)
     if lint_errors:
-        # Format lint errors as strings
-        errors.extend(format_lint_errors(lint_errors))
-        return False, errors
+        return False, lint_errors
     
-    # Stage 2: Run Node.js render test (only if lint passed)
+    # Stage 2: Run Node.js render test (only if lint passed; successes are cached)
     if not skip_render_test:
         try:
-            render_result = run_render_test(text)
-            if not render_result.get("ok", False):
-                # Format render test error
-                error_type = render_result.get("type", "unknown")
-                start_line = render_result.get("startLine", 0)
-                content = render_result.get("content", "")
-                katex_error = render_result.get("katexError", "Unknown error")
-                
-                # Truncate long content
-                if len(content) > 50:
-                    content_preview = content[:50] + "..."
-                else:
-                    content_preview = content
-                
-                errors.append(
-                    f"{error_type.capitalize()} math render error at line {start_line}: {katex_error} "
-                    f"(content: {content_preview})"
-                )
-                return False, errors
+            render_result = _run_render_tests([text])[0]
         except Exception as e:
-            # If render test fails to run (Node.js not available, etc.), log but don't fail
-            # This allows the system to work even if Node.js is not set up
-            import warnings
-            warnings.warn(f"KaTeX render test failed (may not be set up): {e}")
-            # Return True since lint passed - render test is optional
+            # Render test could not run - treat as valid since lint passed
+            _warn_render_test_unavailable(e)
             return True, []
+        if not render_result.get("ok", False):
+            return False, [_format_render_error(render_result)]
     
     return True, []
 
@@ -88,17 +220,20 @@ def normalize_katex_formatting(text: str) -> str:
     Returns:
         Normalized text
     """
+    if not ('$' in text or '\\' in text):
+        return text
+    
     # Convert \( \) to $ $
-    text = re.sub(r'\\\(', '$', text)
-    text = re.sub(r'\\\)', '$', text)
+    text = _RE_LPAREN.sub('$', text)
+    text = _RE_RPAREN.sub('$', text)
     
     # Convert \[ \] to $$ $$
-    text = re.sub(r'\\\[', '$$', text)
-    text = re.sub(r'\\\]', '$$', text)
+    text = _RE_LBRACK.sub('$$', text)
+    text = _RE_RBRACK.sub('$$', text)
     
     # Fix spacing around dollar signs (remove extra spaces)
-    text = re.sub(r'\$\s+', '$', text)
-    text = re.sub(r'\s+\$', '$', text)
+    text = _RE_DOLLAR_LEAD.sub('$', text)
+    text = _RE_DOLLAR_TRAIL.sub('$', text)
     
     return text
 
@@ -107,6 +242,10 @@ def validate_question_package(question_obj: Dict, skip_render_test: bool = False
     """
     Validate KaTeX formatting in a complete question package.
     
+    Distinct texts are render-tested in a single Node.js round-trip on a
+    background thread while the linter runs; render results are only
+    reported for fields that pass lint.
+    
     Args:
         question_obj: Question package dictionary
         skip_render_test: If True, skip Node.js render test (lint only)
@@ -115,83 +254,110 @@ def validate_question_package(question_obj: Dict, skip_render_test: bool = False
     Returns:
         Tuple of (is_valid, list_of_errors)
     """
-    all_errors = []
+    # (error label, text, subject) for every field that needs validating
+    fields: List[Tuple[str, str, Optional[str]]] = []
     
-    # Validate question stem
     question = question_obj.get("question", {})
     if isinstance(question, dict):
         stem = question.get("stem", "")
         if stem:
-            is_valid, errors = validate_katex_formatting(stem, skip_render_test=skip_render_test)
-            if not is_valid:
-                all_errors.extend([f"Question stem: {e}" for e in errors])
+            fields.append(("Question stem", stem, None))
         
-        # Validate options
         options = question.get("options", {})
         if isinstance(options, dict):
             for opt_key, opt_text in options.items():
                 if opt_text:
-                    is_valid, errors = validate_katex_formatting(str(opt_text), skip_render_test=skip_render_test, subject=subject)
-                    if not is_valid:
-                        all_errors.extend([f"Option {opt_key}: {e}" for e in errors])
+                    fields.append((f"Option {opt_key}", str(opt_text), subject))
     
-    # Validate solution
     solution = question_obj.get("solution", {})
     if isinstance(solution, dict):
         reasoning = solution.get("reasoning", "")
         if reasoning:
-            is_valid, errors = validate_katex_formatting(reasoning, skip_render_test=skip_render_test, subject=subject)
-            if not is_valid:
-                all_errors.extend([f"Solution reasoning: {e}" for e in errors])
+            fields.append(("Solution reasoning", reasoning, subject))
         
         key_insight = solution.get("key_insight", "")
         if key_insight:
-            is_valid, errors = validate_katex_formatting(key_insight, skip_render_test=skip_render_test, subject=subject)
-            if not is_valid:
-                all_errors.extend([f"Solution key insight: {e}" for e in errors])
+            fields.append(("Solution key insight", key_insight, subject))
+    
+    # Start the render test for every distinct non-plain text so the Node.js
+    # round-trip overlaps with linting
+    render_future = None
+    if not skip_render_test:
+        render_texts = list(dict.fromkeys(text for _, text, _ in fields if not _is_plain_text(text)))
+        if render_texts:
+            render_future = _RENDER_POOL.submit(_run_render_tests, render_texts)
     
+    # Stage 1: lint each distinct (text, subject) payload once, collecting the
+    # distinct texts that still need a render test
+    lint_results: Dict[Tuple[str, Optional[str]], List[str]] = {}
+    to_render: Dict[str, List[int]] = {}
+    field_errors: List[List[str]] = [[] for _ in fields]
+    for idx, (label, text, field_subject) in enumerate(fields):
+        if _is_plain_text(text):
+            continue
+        payload = (text, field_subject)
+        errors = lint_results.get(payload)
+        if errors is None:
+            errors = lint_results[payload] = _lint_errors(text, field_subject)
+        
+        if errors:
+            field_errors[idx] = [f"{label}: {e}" for e in errors]
+        else:
+            to_render.setdefault(text, []).append(idx)
+    
+    # Stage 2: report render errors for lint-clean texts
+    if render_future is not None:
+        try:
+            render_results = dict(zip(render_texts, render_future.result()))
+        except Exception as e:
+            if to_render:
+                _warn_render_test_unavailable(e)
+            render_results = {}
+        for text, indices in to_render.items():
+            render_result = render_results.get(text)
+            if render_result is not None and not render_result.get("ok", False):
+                error = _format_render_error(render_result)
+                for idx in indices:
+                    field_errors[idx] = [f"{fields[idx][0]}: {error}"]
+    
+    all_errors = [e for errors in field_errors for e in errors]
     return len(all_errors) == 0, all_errors
 
 
+# (section, field) text fields rewritten by fix_katex_formatting; options are handled separately
+_FIX_PATHS = (("question", "stem"), ("solution", "reasoning"), ("solution", "key_insight"))
+
+
+def _fix_in_place(obj: Dict, parent_key: str, child_key: str) -> None:
+    parent = obj.get(parent_key)
+    if isinstance(parent, dict):
+        text = parent.get(child_key)
+        if text:
+            parent[child_key] = normalize_katex_formatting(text)
+
+
 def fix_katex_formatting(question_obj: Dict) -> Dict:
     """
     Fix KaTeX formatting issues in a question package.
     
+    The question and solution sub-dicts are updated in place.
+    
     Args:
         question_obj: Question package dictionary
         
     Returns:
         Fixed question package dictionary
     """
-    question = question_obj.get("question", {})
+    for parent_key, child_key in _FIX_PATHS:
+        _fix_in_place(question_obj, parent_key, child_key)
+    
+    # Fix options (every value is normalized, non-strings are converted to str)
+    question = question_obj.get("question")
     if isinstance(question, dict):
-        # Fix stem
-        stem = question.get("stem", "")
-        if stem:
-            question["stem"] = normalize_katex_formatting(stem)
-        
-        # Fix options
-        options = question.get("options", {})
+        options = question.get("options")
         if isinstance(options, dict):
-            fixed_options = {}
             for opt_key, opt_text in options.items():
-                fixed_options[opt_key] = normalize_katex_formatting(str(opt_text))
-            question["options"] = fixed_options
-        
-        question_obj["question"] = question
-    
-    # Fix solution
-    solution = question_obj.get("solution", {})
-    if isinstance(solution, dict):
-        reasoning = solution.get("reasoning", "")
-        if reasoning:
-            solution["reasoning"] = normalize_katex_formatting(reasoning)
-        
-        key_insight = solution.get("key_insight", "")
-        if key_insight:
-            solution["key_insight"] = normalize_katex_formatting(key_insight)
-        
-        question_obj["solution"] = solution
+                options[opt_key] = normalize_katex_formatting(str(opt_text))
     
     return question_obj
 
@@ -0,0 +1,62 @@
+#!/usr/bin/env node
+/**
+ * Persistent KaTeX render worker.
+ *
+ * Loads KaTeX once, then reads one JSON request per line on stdin. Each item
+ * holds the math expressions of one text, as found by katex_render_test.py:
+ *   {"id": 1, "items": [[{"display": false, "content": "x^2", "startLine": 1}], ...]}
+ * and writes one JSON response per line on stdout, one result per item:
+ *   {"id": 1, "results": [{"ok": true}, {"ok": false, "type": "inline", ...}]}
+ *
+ * Used by katex_render_test.py so the Node.js + KaTeX startup cost is
+ * paid once per process instead of once per render test.
+ */
+
+const readline = require("readline");
+const katex = require("katex");
+
+try {
+  // Chemistry questions use \ce{...}
+  require("katex/contrib/mhchem");
+} catch (e) {
+  // mhchem not installed - chemistry markup will be reported as render errors
+}
+
+function renderSegments(segments) {
+  for (const segment of segments) {
+    const display = Boolean(segment.display);
+    const content = String(segment.content);
+    try {
+      katex.renderToString(content, {
+        displayMode: display,
+        throwOnError: true,
+        strict: "ignore",
+      });
+    } catch (err) {
+      return {
+        ok: false,
+        type: display ? "display" : "inline",
+        startLine: segment.startLine,
+        content: content,
+        katexError: err && err.message ? err.message : String(err),
+      };
+    }
+  }
+  return { ok: true };
+}
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+
+rl.on("line", (line) => {
+  if (!line.trim()) return;
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (err) {
+    process.stdout.write(JSON.stringify({ id: null, error: "Invalid JSON request" }) + "\n");
+    return;
+  }
+  const items = Array.isArray(request.items) ? request.items : [];
+  const results = items.map((segments) => renderSegments(Array.isArray(segments) ? segments : []));
+  process.stdout.write(JSON.stringify({ id: request.id, results: results }) + "\n");
+});
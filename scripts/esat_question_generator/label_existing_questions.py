@@ -9,11 +9,23 @@ import os
 import sys
 import json
 import argparse
+import functools
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
 
+# Optional fast JSON parser for large backup files
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
@@ -36,51 +48,91 @@ if sys.platform == "win32":
         sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
         sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
+# Serializes output from labeling/update worker threads
+_print_lock = threading.Lock()
+
+
+def log(message: str) -> None:
+    """Print a message without interleaving output from other worker threads."""
+    with _print_lock:
+        print(message)
+
 
-def load_questions_from_backups(backup_dir: Path) -> List[Dict[str, Any]]:
-    """Load questions from JSONL backup files."""
-    questions = []
+def iter_questions_from_backups(backup_dir: Path, verbose: bool = True) -> Iterator[Dict[str, Any]]:
+    """Stream questions from JSONL backup files (one question in memory at a time)."""
     if not backup_dir.exists():
         print(f"⚠ Backup directory not found: {backup_dir}")
-        return questions
+        return
     
     for jsonl_file in backup_dir.rglob("questions.jsonl"):
-        print(f"Loading questions from: {jsonl_file}")
-        with open(jsonl_file, 'r', encoding='utf-8') as f:
+        if verbose:
+            log(f"Loading questions from: {jsonl_file}")
+        # Read raw bytes - both orjson and json parse UTF-8 bytes directly
+        with open(jsonl_file, 'rb') as f:
             for line in f:
                 if line.strip():
                     try:
-                        item = json.loads(line)
-                        question_data = item.get("question_data", item)
-                        questions.append(question_data)
-                    except json.JSONDecodeError as e:
-                        print(f"⚠ Error parsing line in {jsonl_file}: {e}")
-    
-    return questions
+                        item = _json_loads(line)
+                    except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses this
+                        log(f"⚠ Error parsing line in {jsonl_file}: {e}")
+                        continue
+                    yield item.get("question_data", item)
+
 
+def _questions_query(db_sync: DatabaseSync, filter_unlabeled: bool, *select_args, **select_kwargs):
+    query = db_sync.client.table("ai_generated_questions").select(*select_args, **select_kwargs)
+    if filter_unlabeled:
+        # Only get questions without tags
+        query = query.or_("primary_tag.is.null,tags_labeled_by.is.null")
+    return query
 
-def load_questions_from_database(db_sync: DatabaseSync, filter_unlabeled: bool = True) -> List[Dict[str, Any]]:
-    """Load questions from Supabase database."""
+
+def count_questions_in_database(db_sync: DatabaseSync, filter_unlabeled: bool = True) -> Optional[int]:
+    """Count questions in Supabase database (None if the count is unavailable)."""
+    if not db_sync.enabled or not db_sync.client:
+        return None
+    try:
+        result = _questions_query(db_sync, filter_unlabeled, "id", count="exact").limit(1).execute()
+        return result.count
+    except Exception as e:
+        print(f"⚠ Error counting questions in database: {e}")
+        return None
+
+
+def iter_questions_from_database(db_sync: DatabaseSync, filter_unlabeled: bool = True,
+                                 page_size: int = 500, max_retries: int = 3) -> Iterator[Dict[str, Any]]:
+    """Stream questions from Supabase database one page at a time.
+    
+    Pages are keyed on id rather than offset: rows leave the unlabeled filter
+    as soon as they are tagged, which would shift offsets mid-run. A page that
+    still fails after max_retries attempts raises, rather than silently ending
+    the run early.
+    """
     if not db_sync.enabled or not db_sync.client:
         print("⚠ Database sync not enabled or client not available")
-        return []
+        return
     
-    try:
-        query = db_sync.client.table("ai_generated_questions").select("*")
-        
-        if filter_unlabeled:
-            # Only get questions without tags
-            query = query.or_("primary_tag.is.null,tags_labeled_by.is.null")
+    last_id = None
+    while True:
+        for attempt in range(max_retries):
+            try:
+                query = _questions_query(db_sync, filter_unlabeled, "*")
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+                rows = query.order("id").limit(page_size).execute().data or []
+                break
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    log(f"⚠ Error loading questions from database: {e}")
+                    raise
+                delay = 2 ** attempt
+                log(f"⚠ Error loading questions from database (retrying in {delay}s): {e}")
+                time.sleep(delay)
         
-        result = query.execute()
-        
-        if result.data:
-            return result.data
-        else:
-            return []
-    except Exception as e:
-        print(f"⚠ Error loading questions from database: {e}")
-        return []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
 
 
 def extract_question_package(question: Dict[str, Any]) -> Dict[str, Any]:
@@ -111,7 +163,7 @@ def label_question(question: Dict[str, Any], llm: LLMClient, prompts, models: Mo
     """Label a single question with curriculum tags."""
     schema_id = question.get("schema_id", "")
     if not schema_id:
-        print(f"⚠ Question missing schema_id, skipping")
+        log(f"⚠ Question missing schema_id, skipping")
         return None
     
     try:
@@ -158,10 +210,24 @@ def label_question(question: Dict[str, Any], llm: LLMClient, prompts, models: Mo
         
         return tags
     except Exception as e:
-        print(f"⚠ Error labeling question {question.get('id', 'unknown')}: {e}")
+        log(f"⚠ Error labeling question {question.get('id', 'unknown')}: {e}")
         return None
 
 
+def build_tag_update(tags: Dict[str, Any]) -> Dict[str, Any]:
+    """Map labeled tags to ai_generated_questions column values."""
+    update_data = {
+        "primary_tag": tags.get("primary_tag"),
+        "secondary_tags": tags.get("secondary_tags", []),
+        "tags_confidence": tags.get("confidence"),
+        "tags_labeled_at": tags.get("labeled_at"),
+        "tags_labeled_by": tags.get("labeled_by"),
+    }
+    
+    # Remove None values
+    return {k: v for k, v in update_data.items() if v is not None}
+
+
 def update_question_tags(db_sync: DatabaseSync, question_id: str, tags: Dict[str, Any], 
                         use_generation_id: bool = False) -> bool:
     """Update question tags in the database."""
@@ -169,16 +235,7 @@ def update_question_tags(db_sync: DatabaseSync, question_id: str, tags: Dict[str
         return False
     
     try:
-        update_data = {
-            "primary_tag": tags.get("primary_tag"),
-            "secondary_tags": tags.get("secondary_tags", []),
-            "tags_confidence": tags.get("confidence"),
-            "tags_labeled_at": tags.get("labeled_at"),
-            "tags_labeled_by": tags.get("labeled_by"),
-        }
-        
-        # Remove None values
-        update_data = {k: v for k, v in update_data.items() if v is not None}
+        update_data = build_tag_update(tags)
         
         query = db_sync.client.table("ai_generated_questions")
         
@@ -191,10 +248,45 @@ def update_question_tags(db_sync: DatabaseSync, question_id: str, tags: Dict[str
         
         return result.data is not None and len(result.data) > 0
     except Exception as e:
-        print(f"⚠ Error updating tags for question {question_id}: {e}")
+        log(f"⚠ Error updating tags for question {question_id}: {e}")
         return False
 
 
+def update_question_tags_bulk(db_sync: DatabaseSync, updates: List[Tuple[str, Dict[str, Any]]],
+                             use_generation_id: bool = False) -> List[bool]:
+    """
+    Update tags for many questions with a single apply_question_tag_updates() call.
+    
+    An upsert can't be used: the partial rows would fail the NOT NULL checks on
+    the insert path before the conflict is detected. Falls back to one update per
+    question if the call fails (e.g. the function has not been created yet).
+    
+    Args:
+        db_sync: Database sync instance
+        updates: List of (question_id, tags) pairs
+        use_generation_id: Match rows on generation_id instead of id
+        
+    Returns:
+        List of booleans (one per update) indicating whether the row was updated
+    """
+    if not updates:
+        return []
+    if not db_sync.enabled or not db_sync.client:
+        return [False] * len(updates)
+    
+    key = "generation_id" if use_generation_id else "id"
+    rows = [{key: question_id, **build_tag_update(tags)} for question_id, tags in updates]
+    
+    try:
+        result = db_sync.client.rpc("apply_question_tag_updates", {"updates": rows}).execute()
+        updated_ids = {str(row.get(key)) for row in (result.data or [])}
+        return [str(question_id) in updated_ids for question_id, _ in updates]
+    except Exception as e:
+        log(f"⚠ Bulk tag update failed, falling back to per-question updates: {e}")
+        return [update_question_tags(db_sync, question_id, tags, use_generation_id=use_generation_id)
+                for question_id, tags in updates]
+
+
 def main():
     parser = argparse.ArgumentParser(description="Label existing questions with curriculum tags")
     parser.add_argument("--source", choices=["database", "backups"], default="database",
@@ -204,12 +296,16 @@ def main():
                        help="Path to backup directory (if source=backups)")
     parser.add_argument("--batch-size", type=int, default=10,
                        help="Number of questions to process in each batch")
+    parser.add_argument("--max-concurrency", type=int, default=4,
+                       help="Maximum number of questions labeled/updated concurrently within a batch")
     parser.add_argument("--dry-run", action="store_true",
                        help="Dry run mode - don't update database")
     parser.add_argument("--curriculum-file", type=str, default=None,
                        help="Path to curriculum JSON file")
     parser.add_argument("--filter-unlabeled", action="store_true", default=True,
                        help="Only process questions without tags")
+    parser.add_argument("--show-total", action="store_true",
+                       help="Count questions up front so progress shows a total (extra count query or pass over the backup files)")
     
     args = parser.parse_args()
     
@@ -227,6 +323,11 @@ def main():
     
     try:
         curriculum_parser = CurriculumParser(curriculum_file)
+        # Normalization only depends on the (immutable) curriculum and the tag
+        # vocabulary is small, so memoize it for the whole run
+        curriculum_parser.normalize_topic_code = functools.lru_cache(maxsize=1024)(
+            curriculum_parser.normalize_topic_code
+        )
         print(f"✓ Loaded curriculum from: {curriculum_file}")
     except Exception as e:
         print(f"❌ Error loading curriculum: {e}")
@@ -246,46 +347,72 @@ def main():
     
     # Load questions
     print(f"\nLoading questions from {args.source}...")
+    total: Optional[int] = None
     if args.source == "database":
         db_sync = DatabaseSync()
-        questions = load_questions_from_database(db_sync, filter_unlabeled=args.filter_unlabeled)
-        print(f"✓ Loaded {len(questions)} questions from database")
+        if args.show_total:
+            total = count_questions_in_database(db_sync, filter_unlabeled=args.filter_unlabeled)
+            if total is not None:
+                print(f"✓ Found {total} questions in database")
+        # Database rows are fetched page by page as batches are consumed
+        question_iter = iter_questions_from_database(db_sync, filter_unlabeled=args.filter_unlabeled)
     else:
         backup_dir = Path(args.backup_dir)
-        questions = load_questions_from_backups(backup_dir)
-        print(f"✓ Loaded {len(questions)} questions from backups")
+        if args.show_total:
+            total = sum(1 for _ in iter_questions_from_backups(backup_dir, verbose=False))
+            print(f"✓ Found {total} questions in backups")
+        # Backups are streamed batch by batch rather than loaded up front
+        question_iter = iter_questions_from_backups(backup_dir)
         db_sync = DatabaseSync()  # Still need for updates
     
-    if not questions:
+    if total == 0:
         print("⚠ No questions to process")
         return
     
     # Process questions in batches
-    total = len(questions)
+    processed = 0
     successful = 0
     failed = 0
     
-    print(f"\nProcessing {total} questions in batches of {args.batch_size}...")
+    if total is not None:
+        print(f"\nProcessing {total} questions in batches of {args.batch_size}...")
+    else:
+        print(f"\nProcessing questions in batches of {args.batch_size}...")
     if args.dry_run:
         print("⚠ DRY RUN MODE - No database updates will be made")
     
-    for i in range(0, total, args.batch_size):
-        batch = questions[i:i + args.batch_size]
-        batch_num = (i // args.batch_size) + 1
-        total_batches = (total + args.batch_size - 1) // args.batch_size
-        
-        print(f"\n--- Batch {batch_num}/{total_batches} ({len(batch)} questions) ---")
-        
-        for question in batch:
-            question_id = question.get("id") or question.get("generation_id", "unknown")
-            print(f"Labeling question: {question_id} ({question.get('schema_id', '?')})")
+    max_concurrency = max(1, min(args.max_concurrency, args.batch_size))
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        batch_num = 0
+        while batch := list(itertools.islice(question_iter, args.batch_size)):
+            batch_num += 1
+            if total is not None:
+                total_batches = (total + args.batch_size - 1) // args.batch_size
+                print(f"\n--- Batch {batch_num}/{total_batches} ({len(batch)} questions) ---")
+            else:
+                print(f"\n--- Batch {batch_num} ({len(batch)} questions) ---")
             
-            tags = label_question(question, llm, prompts, models, curriculum_parser)
+            # Label the whole batch concurrently (LLM calls are latency-bound)
+            for question in batch:
+                question_id = question.get("id") or question.get("generation_id", "unknown")
+                log(f"Labeling question: {question_id} ({question.get('schema_id', '?')})")
+            batch_tags = list(executor.map(
+                lambda q: label_question(q, llm, prompts, models, curriculum_parser), batch
+            ))
             
-            if tags:
-                print(f"  ✓ Primary tag: {tags.get('primary_tag')}")
+            # Report results in batch order and collect database updates
+            pending_updates = []
+            for question, tags in zip(batch, batch_tags):
+                question_id = question.get("id") or question.get("generation_id", "unknown")
+                if not tags:
+                    log(f"  ✗ Failed to label question {question_id}")
+                    failed += 1
+                    continue
+                
+                lines = [f"  ✓ {question_id} primary tag: {tags.get('primary_tag')}"]
                 if tags.get('secondary_tags'):
-                    print(f"  ✓ Secondary tags: {', '.join(tags.get('secondary_tags', []))}")
+                    lines.append(f"  ✓ Secondary tags: {', '.join(tags.get('secondary_tags', []))}")
+                log("\n".join(lines))
                 
                 if not args.dry_run:
                     # Determine ID field to use
@@ -293,26 +420,41 @@ def main():
                     update_id = question.get("generation_id") if use_generation_id else question.get("id")
                     
                     if update_id:
-                        if update_question_tags(db_sync, update_id, tags, use_generation_id=use_generation_id):
-                            print(f"  ✓ Updated database")
-                            successful += 1
-                        else:
-                            print(f"  ✗ Failed to update database")
-                            failed += 1
+                        pending_updates.append((update_id, tags, use_generation_id))
                     else:
-                        print(f"  ⚠ No ID found, skipping database update")
+                        log(f"  ⚠ No ID found for {question_id}, skipping database update")
                         failed += 1
                 else:
                     successful += 1
+            
+            # Apply database updates with one bulk call per ID column
+            update_results = []
+            for use_generation_id in (False, True):
+                group = [(update_id, tags) for update_id, tags, use_gen in pending_updates
+                         if use_gen == use_generation_id]
+                results = update_question_tags_bulk(db_sync, group, use_generation_id=use_generation_id)
+                update_results.extend(zip(group, results))
+            for (update_id, _), updated in update_results:
+                if updated:
+                    log(f"  ✓ Updated database for {update_id}")
+                    successful += 1
+                else:
+                    log(f"  ✗ Failed to update database for {update_id}")
+                    failed += 1
+            
+            processed += len(batch)
+            if total is not None:
+                print(f"\nProgress: {processed}/{total} processed ({successful} successful, {failed} failed)")
             else:
-                print(f"  ✗ Failed to label question")
-                failed += 1
-        
-        print(f"\nProgress: {i + len(batch)}/{total} processed ({successful} successful, {failed} failed)")
+                print(f"\nProgress: {processed} processed so far ({successful} successful, {failed} failed)")
+    
+    if processed == 0:
+        print("⚠ No questions to process")
+        return
     
     print(f"\n{'='*60}")
     print(f"Summary:")
-    print(f"  Total questions: {total}")
+    print(f"  Total questions: {processed}")
     print(f"  Successfully labeled: {successful}")
     print(f"  Failed: {failed}")
     if args.dry_run:
@@ -10,6 +10,58 @@ import re
 from typing import Dict, List, Tuple, Optional
 
 
+# LaTeX-style delimiters \( \[ \) \] (only $ and $$ are allowed)
+_RE_LATEX_DELIMITERS = re.compile(r'\\[\(\[\)\]]')
+# Backslash followed by a non-letter inside a math expression
+_RE_INVALID_COMMAND = re.compile(r'\\[^a-zA-Z]')
+
+
+def _scan_math(text: str) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]], List[int]]:
+    """
+    Tokenize $...$ and $$...$$ regions in a single pass over the dollar signs.
+    
+    Jumps between dollar positions with str.find instead of running several
+    regexes over the whole text. Spans match what re.findall(r'\$[^$]+\$')
+    and re.findall(r'\$\$[^$]+\$\$') would return.
+    
+    Returns:
+        Tuple of (inline_spans, display_spans, dollar_positions), where spans
+        are (start, end) slices including the delimiters
+    """
+    dollars: List[int] = []
+    find = text.find
+    i = find('$')
+    while i != -1:
+        dollars.append(i)
+        i = find('$', i + 1)
+    
+    n = len(dollars)
+    
+    # $...$ : a dollar followed by a non-adjacent dollar
+    inline_spans: List[Tuple[int, int]] = []
+    j = 0
+    while j < n - 1:
+        if dollars[j + 1] - dollars[j] > 1:
+            inline_spans.append((dollars[j], dollars[j + 1] + 1))
+            j += 2
+        else:
+            j += 1
+    
+    # $$...$$ : two adjacent dollars, non-empty content, two adjacent dollars
+    display_spans: List[Tuple[int, int]] = []
+    j = 0
+    while j < n - 3:
+        if (dollars[j + 1] == dollars[j] + 1
+                and dollars[j + 2] > dollars[j + 1] + 1
+                and dollars[j + 3] == dollars[j + 2] + 1):
+            display_spans.append((dollars[j], dollars[j + 3] + 1))
+            j += 4
+        else:
+            j += 1
+    
+    return inline_spans, display_spans, dollars
+
+
 def validate_mathjax_formatting(text: str) -> Tuple[bool, List[str]]:
     """
     Validate that text uses consistent MathJax delimiters.
@@ -23,44 +75,43 @@ def validate_mathjax_formatting(text: str) -> Tuple[bool, List[str]]:
     errors = []
     
     # Check for mixed delimiters (should only use $ and $$)
-    if re.search(r'\\[\(\[\)\]]', text):
+    if _RE_LATEX_DELIMITERS.search(text):
         errors.append("Found LaTeX delimiters \\(, \\[, \\), \\] - use $ and $$ instead")
     
     # Check for unmatched dollar signs (basic check)
-    inline_math = re.findall(r'\$[^$]+\$', text)
-    display_math = re.findall(r'\$\$[^$]+\$\$', text)
+    inline_spans, display_spans, dollars = _scan_math(text)
     
     # Count all dollar signs
-    dollar_count = text.count('$')
+    dollar_count = len(dollars)
     
     # Each inline math uses 2 dollars, each display math uses 4
-    expected_dollars = len(inline_math) * 2 + len(display_math) * 4
+    expected_dollars = len(inline_spans) * 2 + len(display_spans) * 4
     
     if dollar_count != expected_dollars:
         errors.append(f"Mismatched dollar signs: found {dollar_count} but expected {expected_dollars} (likely unmatched $)")
     
-    # Check for common LaTeX errors
-    if re.search(r'\$\$[^$]*\$[^$]*\$\$', text):
-        errors.append("Found single $ inside $$ block - likely formatting error")
+    # Check for common LaTeX errors: $$ ... $ ... $$ (five consecutive dollar signs)
+    for j in range(dollar_count - 4):
+        if dollars[j + 1] == dollars[j] + 1 and dollars[j + 4] == dollars[j + 3] + 1:
+            errors.append("Found single $ inside $$ block - likely formatting error")
+            break
     
-    # Check for nested dollar signs (invalid)
-    if re.search(r'\$[^$]*\$[^$]*\$', text):
+    # Check for nested dollar signs (invalid) - any three dollar signs
+    if dollar_count >= 3:
         errors.append("Found nested dollar signs - check for unmatched $")
     
     # Validate basic LaTeX syntax (check for common errors)
-    all_math = inline_math + display_math
-    for math_expr in all_math:
+    for start, end in inline_spans + display_spans:
+        math_expr = text[start:end]
         # Remove delimiters
         content = math_expr.strip('$')
         
         # Check for unmatched braces
-        open_braces = content.count('{')
-        close_braces = content.count('}')
-        if open_braces != close_braces:
+        if content.count('{') != content.count('}'):
             errors.append(f"Unmatched braces in: {math_expr[:50]}...")
         
         # Check for common LaTeX errors
-        if re.search(r'\\[^a-zA-Z]', content):
+        if _RE_INVALID_COMMAND.search(content):
             errors.append(f"Invalid LaTeX command in: {math_expr[:50]}...")
     
     return len(errors) == 0, errors
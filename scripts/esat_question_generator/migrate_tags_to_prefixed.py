@@ -6,13 +6,22 @@ This script updates existing questions in the database to use prefixed curriculu
 (e.g., "M1-M1", "M2-MM1", "P-P1") instead of raw codes (e.g., "M1", "MM1", "P1").
 
 Run this script after implementing the prefixed tag system to migrate existing data.
+
+Apply the 20260201* migrations in supabase/migrations first: they add the
+questions_needing_tag_migration() / apply_question_tag_updates() functions and
+the partial indexes behind them. Without them the script falls back to scanning
+every question and updating rows one at a time.
 """
 
 import os
 import sys
 import argparse
+import functools
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 
 # Add parent directory to path for imports
@@ -26,6 +35,12 @@ if env_path.exists():
 from curriculum_parser import CurriculumParser
 from db_sync import DatabaseSync
 
+# Number of candidate questions fetched per page
+PAGE_SIZE = 2000
+
+# Number of question updates written per apply_question_tag_updates() call
+UPDATE_BATCH_SIZE = 500
+
 # Configure UTF-8 encoding for Windows console
 if sys.platform == "win32":
     try:
@@ -81,47 +96,162 @@ def migrate_tag(tag: str, parser: CurriculumParser) -> Optional[str]:
     return normalized
 
 
-def migrate_question_tags(question: Dict, parser: CurriculumParser) -> Dict:
+def find_raw_tags(question: Dict) -> Tuple[bool, Sequence[int]]:
+    """
+    Classify a question's tags in one pass (same rule as needs_migration()).
+    
+    Args:
+        question: Question dictionary from database
+    
+    Returns:
+        Tuple of (primary tag is raw, indices of raw secondary tags)
+    """
+    primary_tag = question.get("primary_tag")
+    raw_primary = bool(primary_tag) and "-" not in primary_tag
+    
+    secondary_tags = question.get("secondary_tags")
+    if secondary_tags and isinstance(secondary_tags, list):
+        raw_secondary = [i for i, tag in enumerate(secondary_tags) if tag and "-" not in tag]
+    else:
+        raw_secondary = ()  # no per-row allocation for rows without secondary tags
+    
+    return raw_primary, raw_secondary
+
+
+def iter_questions_needing_migration(db_sync: DatabaseSync,
+                                     page_size: int = PAGE_SIZE) -> Iterator[Tuple[Dict, Tuple[bool, Sequence[int]]]]:
+    """
+    Stream questions that have at least one raw (unprefixed) tag, one page at a time.
+    
+    Uses the questions_needing_tag_migration() database function so only those rows
+    are transferred. Falls back to paging through every question and filtering
+    locally if the function has not been created yet. Pages are keyed on id, so
+    rows that are migrated while the stream is running don't shift later pages.
+    
+    Args:
+        db_sync: DatabaseSync instance with an enabled client
+        page_size: Number of rows fetched per request
+    
+    Yields:
+        (question, raw_tags) pairs: the question dictionary (id, primary_tag,
+        secondary_tags) and its find_raw_tags() result
+    """
+    use_rpc = True
+    last_id = None
+    while True:
+        if use_rpc:
+            try:
+                result = db_sync.client.rpc(
+                    "questions_needing_tag_migration",
+                    {"after_id": last_id, "page_size": page_size},
+                ).execute()
+                page = result.data or []
+            except Exception as e:
+                if last_id is not None:
+                    raise
+                print(f"  ⚠ questions_needing_tag_migration() unavailable, filtering all questions locally: {e}")
+                use_rpc = False
+                continue
+        else:
+            query = db_sync.client.table("ai_generated_questions").select("id,primary_tag,secondary_tags")
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            result = query.order("id").limit(page_size).execute()
+            page = result.data or []
+        
+        # Classify each tag once here; migrate_question_tags() reuses the result
+        # (rows from the function always have a raw tag, fallback rows may not)
+        for q in page:
+            raw_tags = find_raw_tags(q)
+            if raw_tags[0] or raw_tags[1]:
+                yield q, raw_tags
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["id"]
+
+
+def apply_tag_updates(db_sync: DatabaseSync, pending: List[Tuple[str, Dict]]) -> List[bool]:
+    """
+    Write a batch of tag updates with a single apply_question_tag_updates() call.
+    
+    Falls back to one UPDATE per question if the batch call fails (e.g. the
+    function has not been created yet).
+    
+    Args:
+        db_sync: DatabaseSync instance with an enabled client
+        pending: List of (question_id, updates) pairs
+    
+    Returns:
+        List of booleans (one per pair) indicating whether the row was updated
+    """
+    if not pending:
+        return []
+    
+    rows = [{"id": question_id, **updates} for question_id, updates in pending]
+    try:
+        result = db_sync.client.rpc("apply_question_tag_updates", {"updates": rows}).execute()
+        updated_ids = {str(row.get("id")) for row in (result.data or [])}
+        return [str(question_id) in updated_ids for question_id, _ in pending]
+    except Exception as e:
+        print(f"  ⚠ Batch update failed, falling back to per-question updates: {e}")
+    
+    results = []
+    for question_id, updates in pending:
+        try:
+            db_sync.client.table("ai_generated_questions").update(updates).eq("id", question_id).execute()
+            results.append(True)
+        except Exception as e:
+            print(f"  ✗ Failed to update question {question_id}: {e}")
+            results.append(False)
+    return results
+
+
+def migrate_question_tags(question: Dict, parser: CurriculumParser,
+                          raw_tags: Optional[Tuple[bool, Sequence[int]]] = None,
+                          messages: Optional[List[str]] = None) -> Dict:
     """
     Migrate tags for a single question.
     
     Args:
         question: Question dictionary from database
         parser: CurriculumParser instance
+        raw_tags: Precomputed find_raw_tags(question) result (computed if omitted)
+        messages: If given, a description of each tag change is appended to it
     
     Returns:
         Dictionary with updated tags, or empty dict if no changes needed
     """
     updates = {}
+    raw_primary, raw_secondary = raw_tags if raw_tags is not None else find_raw_tags(question)
     
-    # Migrate primary_tag
-    primary_tag = question.get("primary_tag")
-    if needs_migration(primary_tag):
-        migrated_primary = migrate_tag(primary_tag, parser)
+    # Migrate primary_tag (already known to be raw, so normalize it directly
+    # rather than through migrate_tag())
+    if raw_primary:
+        primary_tag = question["primary_tag"]
+        migrated_primary = parser.normalize_topic_code(primary_tag)
         if migrated_primary:
             updates["primary_tag"] = migrated_primary
-            print(f"  Primary tag: {primary_tag} → {migrated_primary}")
-        else:
-            print(f"  ⚠ Could not migrate primary tag: {primary_tag}")
+            if messages is not None:
+                messages.append(f"  Primary tag: {primary_tag} → {migrated_primary}")
+        elif messages is not None:
+            messages.append(f"  ⚠ Could not migrate primary tag: {primary_tag}")
     
-    # Migrate secondary_tags
-    secondary_tags = question.get("secondary_tags")
-    if secondary_tags and isinstance(secondary_tags, list):
-        migrated_secondary = []
+    # Migrate secondary_tags - only the raw positions; prefixed tags and tags that
+    # can't be migrated are kept as they are
+    if raw_secondary:
+        migrated_secondary = list(question["secondary_tags"])
         changed = False
         
-        for tag in secondary_tags:
-            if needs_migration(tag):
-                migrated_tag = migrate_tag(tag, parser)
-                if migrated_tag:
-                    migrated_secondary.append(migrated_tag)
-                    changed = True
-                    print(f"  Secondary tag: {tag} → {migrated_tag}")
-                else:
-                    print(f"  ⚠ Could not migrate secondary tag: {tag}")
-                    migrated_secondary.append(tag)  # Keep original if migration fails
-            else:
-                migrated_secondary.append(tag)  # Already prefixed or None
+        for idx in raw_secondary:
+            tag = migrated_secondary[idx]
+            migrated_tag = parser.normalize_topic_code(tag)
+            if migrated_tag:
+                migrated_secondary[idx] = migrated_tag
+                changed = True
+                if messages is not None:
+                    messages.append(f"  Secondary tag: {tag} → {migrated_tag}")
+            elif messages is not None:
+                messages.append(f"  ⚠ Could not migrate secondary tag: {tag}")
         
         if changed:
             updates["secondary_tags"] = migrated_secondary
@@ -129,6 +259,68 @@ def migrate_question_tags(question: Dict, parser: CurriculumParser) -> Dict:
     return updates
 
 
+def build_prefix_map(parser: CurriculumParser) -> Dict[str, str]:
+    """
+    Map every raw curriculum code to its prefixed code.
+    
+    Args:
+        parser: CurriculumParser instance
+    
+    Returns:
+        Dictionary of raw code -> prefixed code, as normalize_topic_code() maps them
+    """
+    prefix_map = {}
+    for code in parser.get_all_topic_codes():
+        if "-" not in code:
+            prefixed_code = parser.normalize_topic_code(code)
+            if prefixed_code:
+                prefix_map[code] = prefixed_code
+    return prefix_map
+
+
+def migrate_in_database(db_sync: DatabaseSync, parser: CurriculumParser) -> int:
+    """
+    Run the whole migration in the database with the migrate_tags_to_prefixed() function.
+    
+    Syncs curriculum_prefix_map with the curriculum first, then makes a single call
+    instead of transferring rows. Both write to the database, so dry runs use the
+    client-side path instead.
+    
+    Args:
+        db_sync: DatabaseSync instance with an enabled client
+        parser: CurriculumParser instance
+    
+    Returns:
+        Number of questions whose tags were changed
+    
+    Raises:
+        Exception: If the table/function is missing or a request fails
+    """
+    prefix_map = build_prefix_map(parser)
+    if not prefix_map:
+        raise ValueError("curriculum has no raw topic codes")
+    
+    rows = [{"raw_code": raw_code, "prefixed_code": prefixed_code} for raw_code, prefixed_code in prefix_map.items()]
+    db_sync.client.table("curriculum_prefix_map").upsert(rows, on_conflict="raw_code").execute()
+    # Drop codes that are no longer in the curriculum
+    db_sync.client.table("curriculum_prefix_map").delete().not_.in_("raw_code", list(prefix_map)).execute()
+    
+    result = db_sync.client.rpc("migrate_tags_to_prefixed", {"dry_run": False}).execute()
+    return int(result.data or 0)
+
+
+def print_summary(processed: int, migrated_count: int, failed_count: int, dry_run: bool):
+    print("\n" + "=" * 60)
+    print("Migration Summary")
+    print("=" * 60)
+    print(f"  Total questions processed: {processed}")
+    print(f"  Successfully migrated: {migrated_count}")
+    print(f"  Failed: {failed_count}")
+    if dry_run:
+        print(f"  (Dry run - no actual changes made)")
+    print()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Migrate curriculum tags from raw format to prefixed format"
@@ -143,6 +335,22 @@ def main():
         type=int,
         help="Limit number of questions to process (for testing)"
     )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show every question's tag changes (implied by --dry-run)"
+    )
+    parser.add_argument(
+        "--client-side",
+        action="store_true",
+        help="Migrate rows in this script instead of with the migrate_tags_to_prefixed() database function"
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of update batches written to the database concurrently"
+    )
     
     args = parser.parse_args()
     
@@ -154,6 +362,14 @@ def main():
     # Load curriculum parser
     try:
         curriculum_parser = CurriculumParser()
+        # Both lookups only depend on the (immutable) curriculum and the same few
+        # codes repeat across thousands of questions, so memoize them for the run
+        curriculum_parser.normalize_topic_code = functools.lru_cache(maxsize=4096)(
+            curriculum_parser.normalize_topic_code
+        )
+        curriculum_parser.validate_topic_code = functools.lru_cache(maxsize=4096)(
+            curriculum_parser.validate_topic_code
+        )
         print("✓ Loaded curriculum parser")
     except Exception as e:
         print(f"✗ Failed to load curriculum parser: {e}")
@@ -167,81 +383,122 @@ def main():
         print(f"✗ Failed to connect to database: {e}")
         return 1
     
-    # Fetch all questions
-    print("\nFetching questions from database...")
-    try:
-        if not db_sync.enabled or not db_sync.client:
-            print("✗ Database sync is not enabled or client not available")
-            return 1
-        questions = db_sync.client.table("ai_generated_questions").select("*").execute()
-        questions_data = questions.data if hasattr(questions, 'data') else []
-        print(f"✓ Loaded {len(questions_data)} questions")
-    except Exception as e:
-        print(f"✗ Failed to fetch questions: {e}")
+    if not db_sync.enabled or not db_sync.client:
+        print("✗ Database sync is not enabled or client not available")
         return 1
     
-    if args.limit:
-        questions_data = questions_data[:args.limit]
-        print(f"  (Limited to {len(questions_data)} questions for testing)")
-    
-    # Filter questions that need migration
-    questions_to_migrate = []
-    for q in questions_data:
-        primary_tag = q.get("primary_tag")
-        secondary_tags = q.get("secondary_tags", [])
-        
-        if needs_migration(primary_tag) or any(needs_migration(tag) for tag in (secondary_tags or [])):
-            questions_to_migrate.append(q)
+    if args.dry_run:
+        print("\n⚠ DRY RUN MODE - No database updates will be made\n")
+    show_details = args.verbose or args.dry_run
     
-    print(f"\nFound {len(questions_to_migrate)} questions that need migration")
+    # Migrate everything in one database call unless limited or told otherwise.
+    # Dry runs and --verbose use the client-side path: the database function only
+    # returns a count, and its prefix map sync writes to the database.
+    if not args.client_side and not args.limit and not show_details:
+        print("\nMigrating tags in the database...")
+        try:
+            changed_count = migrate_in_database(db_sync, curriculum_parser)
+        except Exception as e:
+            print(f"  ⚠ In-database migration unavailable, migrating client-side: {e}")
+        else:
+            if not changed_count:
+                print("✓ No migration needed - all tags are already in prefixed format!")
+                return 0
+            print_summary(changed_count, changed_count, 0, args.dry_run)
+            return 0
     
-    if not questions_to_migrate:
-        print("✓ No migration needed - all tags are already in prefixed format!")
-        return 0
+    # Stream questions that still have raw tags
+    print("\nStreaming questions that need migration...")
+    questions_to_migrate = iter_questions_needing_migration(db_sync)
     
-    if args.dry_run:
-        print("\n⚠ DRY RUN MODE - No database updates will be made\n")
+    if args.limit:
+        questions_to_migrate = itertools.islice(questions_to_migrate, args.limit)
+        print(f"  (Limited to {args.limit} questions for testing)")
     
-    # Process each question
+    # Process each question; database writes and report lines are buffered and
+    # flushed in batches rather than printed per question
     migrated_count = 0
     failed_count = 0
+    processed = 0
+    pending: List[Tuple[str, Dict]] = []
+    output: List[str] = []
     
-    for i, question in enumerate(questions_to_migrate, 1):
-        question_id = question.get("id", "unknown")
-        print(f"\n[{i}/{len(questions_to_migrate)}] Question {question_id}")
-        
-        try:
-            updates = migrate_question_tags(question, curriculum_parser)
+    # Update batches are written on worker threads while the next page is fetched
+    # and migrated; at most --max-concurrency batches are in flight at once
+    executor = ThreadPoolExecutor(max_workers=max(1, args.max_concurrency))
+    in_flight = deque()
+    
+    def collect_oldest():
+        nonlocal migrated_count, failed_count
+        batch, future = in_flight.popleft()
+        results = future.result()
+        updated = sum(results)
+        output.append(f"\n  ✓ Updated {updated}/{len(batch)} questions in database")
+        for (question_id, _), ok in zip(batch, results):
+            if not ok:
+                output.append(f"  ✗ Failed to update database for question {question_id}")
+        migrated_count += updated
+        failed_count += len(batch) - updated
+    
+    def flush_pending():
+        batch = list(pending)
+        pending.clear()
+        in_flight.append((batch, executor.submit(apply_tag_updates, db_sync, batch)))
+        while len(in_flight) >= max(1, args.max_concurrency):
+            collect_oldest()
+    
+    def flush_output():
+        output.append(f"\nProgress: {processed} processed ({migrated_count} migrated, {failed_count} failed)")
+        print("\n".join(output))
+        output.clear()
+    
+    try:
+        for question, raw_tags in questions_to_migrate:
+            processed += 1
+            question_id = question.get("id", "unknown")
+            messages = [f"\n[{processed}] Question {question_id}"] if show_details else None
             
-            if updates:
-                if not args.dry_run:
-                    # Update in database
-                    try:
-                        result = db_sync.client.table("ai_generated_questions").update(updates).eq("id", question_id).execute()
-                        print(f"  ✓ Updated in database")
+            try:
+                updates = migrate_question_tags(question, curriculum_parser, raw_tags, messages)
+                
+                if updates:
+                    if not args.dry_run:
+                        pending.append((question_id, updates))
+                    else:
+                        messages.append(f"  [DRY RUN] Would update: {updates}")
                         migrated_count += 1
-                    except Exception as e:
-                        print(f"  ✗ Failed to update database: {e}")
-                        failed_count += 1
-                else:
-                    print(f"  [DRY RUN] Would update: {updates}")
-                    migrated_count += 1
-            else:
-                print(f"  - No changes needed")
-        except Exception as e:
-            print(f"  ✗ Error processing question: {e}")
-            failed_count += 1
+                elif messages is not None:
+                    messages.append(f"  - No changes needed")
+            except Exception as e:
+                if messages is None:
+                    messages = [f"\n[{processed}] Question {question_id}"]
+                messages.append(f"  ✗ Error processing question: {e}")
+                failed_count += 1
+            
+            if messages:
+                output.extend(messages)
+            if len(pending) >= UPDATE_BATCH_SIZE:
+                flush_pending()
+            if processed % UPDATE_BATCH_SIZE == 0:
+                flush_output()
+    except Exception as e:
+        # Fetching the next page failed - still write what was already migrated
+        output.append(f"\n✗ Failed to fetch questions: {e}")
+        failed_count += 1
     
-    # Summary
-    print("\n" + "=" * 60)
-    print("Migration Summary")
-    print("=" * 60)
-    print(f"  Total questions processed: {len(questions_to_migrate)}")
-    print(f"  Successfully migrated: {migrated_count}")
-    print(f"  Failed: {failed_count}")
-    if args.dry_run:
-        print(f"  (Dry run - no actual changes made)")
-    print()
+    if pending:
+        flush_pending()
+    while in_flight:
+        collect_oldest()
+    executor.shutdown()
+    if output:
+        flush_output()
+    
+    if processed == 0 and failed_count == 0:
+        print("✓ No migration needed - all tags are already in prefixed format!")
+        return 0
+    
+    print_summary(processed, migrated_count, failed_count, args.dry_run)
     
     return 0 if failed_count == 0 else 1
 
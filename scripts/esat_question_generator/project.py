@@ -48,12 +48,18 @@ import re
 import json
 import time
 import random
+import socket
 import hashlib
+import pickle
 import datetime
+import functools
+import email.utils
 import threading
 import sqlite3
+import uuid
 from pathlib import Path
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Dict, Any, List, Optional, Tuple, Callable
 from dotenv import load_dotenv
 
@@ -69,13 +75,21 @@ if sys.platform == "win32":
         sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
         sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
-# GUI support
-try:
-    import tkinter as tk
-    from tkinter import ttk, scrolledtext
-    _TKINTER_AVAILABLE = True
-except ImportError:
-    _TKINTER_AVAILABLE = False
+# GUI support - tkinter is imported on first GUI use, so headless runs never load Tcl/Tk
+tk = ttk = scrolledtext = None
+_TKINTER_AVAILABLE: Optional[bool] = None  # None until _import_tk() has been called
+
+def _import_tk() -> bool:
+    """Import tkinter into the module globals on first call; returns whether it is available."""
+    global tk, ttk, scrolledtext, _TKINTER_AVAILABLE
+    if _TKINTER_AVAILABLE is None:
+        try:
+            import tkinter as tk
+            from tkinter import ttk, scrolledtext
+            _TKINTER_AVAILABLE = True
+        except ImportError:
+            _TKINTER_AVAILABLE = False
+    return _TKINTER_AVAILABLE
 
 # ---------- Optional dependencies ----------
 try:
@@ -83,12 +97,41 @@ try:
 except ImportError as e:
     raise SystemExit("Missing dependency: pyyaml. Install with `pip install pyyaml`") from e
 
+# Use the libyaml-backed C loader/dumper when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Optional fast JSON serializer for run files (JSONL logs, stats.json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Google GenAI SDK (Gemini)
 _GENAI_AVAILABLE = True
 try:
     from google import genai
 except Exception:
     _GENAI_AVAILABLE = False
+try:
+    from google.genai import errors as genai_errors
+except Exception:
+    genai_errors = None
+
+# Sibling pipeline modules (backups, database sync, KaTeX checks), imported once
+# here; run_once skips any step whose module isn't available
+try:
+    from backup_manager import backup_question_from_pipeline
+except ImportError:
+    backup_question_from_pipeline = None
+try:
+    from db_sync import sync_question_from_pipeline
+except ImportError:
+    sync_question_from_pipeline = None
+try:
+    from katex_validator import validate_katex_formatting, validate_question_package, fix_katex_formatting
+except ImportError:
+    validate_katex_formatting = validate_question_package = fix_katex_formatting = None
 
 
 # ---------- Config ----------
@@ -100,6 +143,10 @@ class ModelsConfig:
     verifier: str = "gemini-2.5-flash"
     style_judge: str = "gemini-2.5-flash"
     classifier: str = "gemini-2.5-flash"  # NEW: For curriculum tag classification
+    # Output token caps for the short style checker / classifier reports (None = model default).
+    # On Gemini 2.5 models thinking tokens count against the cap, so keep it well above the report size.
+    style_max_output_tokens: Optional[int] = 8192
+    classifier_max_output_tokens: Optional[int] = 8192
 
 
 def get_default_models_config() -> ModelsConfig:
@@ -115,6 +162,8 @@ def get_default_models_config() -> ModelsConfig:
         verifier=os.environ.get("MODEL_VERIFIER", "gemini-2.5-flash"),
         style_judge=os.environ.get("MODEL_STYLE", "gemini-2.5-flash"),
         classifier=os.environ.get("MODEL_CLASSIFIER", "gemini-2.5-flash"),
+        style_max_output_tokens=int(os.environ.get("MAX_OUTPUT_TOKENS_STYLE", "8192")) or None,
+        classifier_max_output_tokens=int(os.environ.get("MAX_OUTPUT_TOKENS_CLASSIFIER", "8192")) or None,
     )
 
 
@@ -129,6 +178,33 @@ class RunConfig:
     allow_schema_prefixes: Tuple[str, ...] = ("P", "B", "C")  # choose physics, biology & chemistry by default
     enable_tag_labeling: bool = True  # Enable curriculum tag labeling
     curriculum_file_path: Optional[str] = None  # Path to curriculum JSON (default: curriculum/ESAT_CURRICULUM.json)
+    fuse_assessment: bool = False  # Run verifier + style checker as one LLM call (assess_call)
+    parallel_assessment: bool = False  # Run the style checker alongside the verifier (without its report)
+
+
+def _build_run_config_from_env(**overrides: Any) -> RunConfig:
+    """
+    Builds the RunConfig from environment variables (.env.local settings).
+    Keyword arguments replace individual fields.
+    """
+    env = os.environ
+    fields: Dict[str, Any] = {
+        "max_implementer_retries": int(env.get("MAX_IMPLEMENTER_RETRIES", "2")),
+        "max_designer_retries": int(env.get("MAX_DESIGNER_RETRIES", "2")),
+        "seed": int(env["SEED"]) if env.get("SEED") else None,
+        "difficulty_weights": {
+            "Easy": float(env.get("W_EASY", "0.3")),
+            "Medium": float(env.get("W_MED", "0.5")),
+            "Hard": float(env.get("W_HARD", "0.2")),
+        },
+        "schema_weights": None,
+        "out_dir": env.get("OUT_DIR", "runs"),
+        "allow_schema_prefixes": tuple(env.get("SCHEMA_PREFIXES", "M,P").split(",")),
+        "fuse_assessment": env.get("FUSE_ASSESSMENT", "0") == "1",
+        "parallel_assessment": env.get("PARALLEL_ASSESSMENT", "0") == "1",
+    }
+    fields.update(overrides)
+    return RunConfig(**fields)
 
 
 # ---------- Utilities ----------
@@ -143,8 +219,25 @@ def ensure_dir(path: str) -> None:
 def now_stamp() -> str:
     return datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
+_now_iso_cache: Tuple[int, str] = (-1, "")
+
+def now_iso() -> str:
+    """Local time as ISO 8601 at one-second resolution, formatted at most once per second."""
+    global _now_iso_cache
+    second = int(time.time())
+    cached_second, text = _now_iso_cache
+    if second != cached_second:
+        text = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+        _now_iso_cache = (second, text)
+    return text
+
 def sha1_short(s: str) -> str:
-    return hashlib.sha1(s.encode("utf-8")).hexdigest()[:10]
+    """10-hex-char content fingerprint (blake2b with a 5-byte digest; name kept for callers)."""
+    return hashlib.blake2b(s.encode("utf-8"), digest_size=5).hexdigest()
+
+# Code fence patterns for strip_code_fences (compiled once)
+_FENCE_OPEN_RE = re.compile(r"^```[a-zA-Z0-9_-]*\s*\n")
+_FENCE_CLOSE_RE = re.compile(r"\n```$")
 
 def strip_code_fences(text: str) -> str:
     """
@@ -154,16 +247,46 @@ def strip_code_fences(text: str) -> str:
     # Common patterns: ```yaml\n...\n``` or ```\n...\n```
     if t.startswith("```"):
         # Remove first fence line
-        t = re.sub(r"^```[a-zA-Z0-9_-]*\s*\n", "", t)
+        t = _FENCE_OPEN_RE.sub("", t)
         # Remove ending fence
-        t = re.sub(r"\n```$", "", t.strip())
+        t = _FENCE_CLOSE_RE.sub("", t.strip())
     return t.strip()
 
+def yaml_dump(obj: Any, **kwargs: Any) -> str:
+    """yaml.safe_dump equivalent using the C dumper when available."""
+    return yaml.dump(obj, Dumper=_YAML_DUMPER, **kwargs)
+
+def _strip_private_keys(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {k: _strip_private_keys(v) for k, v in obj.items()
+                if not (isinstance(k, str) and k.startswith("_"))}
+    return obj
+
+def prompt_yaml(obj: Any, **kwargs: Any) -> str:
+    """
+    yaml_dump for embedding pipeline objects in LLM prompts.
+    Leaves out private bookkeeping keys (_warning, _format_fixer_reason, ...),
+    which are pipeline state rather than question content. Defaults to the
+    compact form (flow style for short leaf collections, non-ASCII kept as-is,
+    no line wrapping) to save prompt tokens; callers can override any of these.
+    """
+    kwargs.setdefault("default_flow_style", None)
+    kwargs.setdefault("allow_unicode", True)
+    kwargs.setdefault("width", 1_000_000)
+    return yaml_dump(_strip_private_keys(obj), **kwargs)
+
 def safe_yaml_load(text: str) -> Any:
     """Safely load YAML, with clearer errors."""
     cleaned = strip_code_fences(text)
+    # Models often answer in JSON, which is also YAML: json.loads is much faster,
+    # so try it first for JSON-shaped text and fall back to the YAML parser
+    if cleaned[:1] in ("{", "["):
+        try:
+            return orjson.loads(cleaned) if orjson is not None else json.loads(cleaned)
+        except ValueError:
+            pass
     try:
-        result = yaml.safe_load(cleaned)
+        result = yaml.load(cleaned, Loader=_YAML_LOADER)
         if result is None:
             raise ValueError("YAML parsed to None (empty or invalid YAML).")
         return result
@@ -221,9 +344,78 @@ def normalize_implementer_output(obj: Dict[str, Any]) -> Dict[str, Any]:
     
     return obj
 
+def json_bytes(obj: Any, indent: bool = False) -> bytes:
+    """UTF-8 JSON (non-ASCII kept as-is), via orjson when installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits: let json handle (or report) it
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def write_json(path: str, obj: Any, indent: bool = False) -> None:
+    """
+    Writes a JSON document (compact unless indent=True) in a single write.
+    The bytes go to a temp file that then replaces path, so a crash mid-write
+    never leaves a truncated document behind.
+    """
+    data = json_bytes(obj, indent=indent)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
 def dump_jsonl(path: str, obj: Dict[str, Any]) -> None:
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    with open(path, "ab") as f:
+        f.write(json_bytes(obj) + b"\n")
+
+class JsonlWriter:
+    """Appends JSONL records through one buffered handle per file.
+
+    Files are opened on first write (so nothing is created for files that are
+    never written) and kept open until close(), instead of an open/close per
+    record as with dump_jsonl. JSON documents registered with write_on_close()
+    (e.g. a run's stats) are written once, in their final state, by close().
+    """
+
+    def __init__(self, buffering: int = 1 << 16):
+        self.buffering = buffering
+        self._handles: Dict[str, Any] = {}
+        self._on_close: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def write(self, path: str, obj: Dict[str, Any]) -> None:
+        line = json_bytes(obj) + b"\n"
+        with self._lock:
+            fh = self._handles.get(path)
+            if fh is None:
+                fh = self._handles[path] = open(path, "ab", buffering=self.buffering)
+            fh.write(line)
+
+    def write_on_close(self, path: str, obj: Any) -> None:
+        self._on_close[path] = obj
+
+    def flush(self) -> None:
+        for fh in self._handles.values():
+            fh.flush()
+
+    def close(self) -> None:
+        handles, self._handles = self._handles, {}
+        for fh in handles.values():
+            fh.close()
+        documents, self._on_close = self._on_close, {}
+        for path, obj in documents.items():
+            write_json(path, obj)
 
 
 # ---------- Subject-specific helper functions ----------
@@ -277,6 +469,11 @@ def get_subject_from_schema(schema_id: str) -> str:
     return mapping.get(prefix, 'mathematics')
 
 
+# "### If `subject: physics`" section headers (group 1: the subject, if any) and
+# any other markdown header that ends such a section
+_SUBJECT_HEADER_RE = re.compile(r"\s*### If `subject:(?:\s*(\w+))?")
+_SECTION_HEADER_RE = re.compile(r"\s*##")
+
 def filter_prompt_by_subject(prompt_text: str, subject: str) -> str:
     """
     Extract only the relevant subject-specific section from universal prompts.
@@ -292,33 +489,22 @@ def filter_prompt_by_subject(prompt_text: str, subject: str) -> str:
     2. Extracts ONLY the relevant subject section
     3. Returns the filtered prompt with subject-specific instructions inline
     """
-    lines = prompt_text.split('\n')
     filtered_lines = []
     in_subject_section = False
-    current_subject = None
     capture = True  # Always capture lines not in if blocks
     
-    for line in lines:
-        # Check if this is a subject-specific header
-        if line.strip().startswith('### If `subject:'):
-            # Extract subject name from header
-            match = re.search(r'subject:\s*(\w+)', line)
-            if match:
-                current_subject = match.group(1).strip()
-                if current_subject == subject:
-                    # This is our subject section - capture following lines
-                    in_subject_section = True
-                    capture = True
-                else:
-                    # This is a different subject section - skip
-                    in_subject_section = True
-                    capture = False
+    for line in prompt_text.split('\n'):
+        header = _SUBJECT_HEADER_RE.match(line)
+        if header:
+            # Subject-specific header: capture the following lines only for our subject
+            if header.group(1):
+                in_subject_section = True
+                capture = header.group(1) == subject
                 continue  # Don't include the header itself
             
         # Check if we're exiting a subject section (next ### header or ## header)
-        elif line.strip().startswith('##') and in_subject_section:
+        elif in_subject_section and _SECTION_HEADER_RE.match(line):
             in_subject_section = False
-            current_subject = None
             capture = True
             
         # Add line if we're capturing
@@ -343,6 +529,9 @@ def get_subject_prompts(prompts: 'Prompts', schema_id: str) -> Dict[str, str]:
 
 # Updated regex to accept numbered (M1, P3), unique (M_a1b2c3d4), and unnumbered (M., P.) formats
 SCHEMA_HEADER_RE = re.compile(r"^##\s+\*\*((?:M|P|B|C)(?:\d+|_[a-f0-9]{8}))\.?\s+(.+?)\*\*\s*$", re.MULTILINE)
+EXEMPLAR_ID_RE = re.compile(r"- `([^`]+)`:")
+_TITLE_STRIP_RE = re.compile(r'[^a-zA-Z0-9\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
 
 def parse_schemas_from_markdown(md: str, allow_prefixes: Tuple[str, ...]=("M","P")) -> Dict[str, Dict[str, str]]:
     """
@@ -351,12 +540,23 @@ def parse_schemas_from_markdown(md: str, allow_prefixes: Tuple[str, ...]=("M","P
     For unnumbered schemas, generates schema_id as {prefix}_{sanitized_title}.
     Returns: { "M1": {"title": "...", "block": "## M1...."} , ... }
     """
-    matches = list(SCHEMA_HEADER_RE.finditer(md))
     schemas: Dict[str, Dict[str, str]] = {}
     unnumbered_counter = {}  # Track unnumbered schemas per prefix
-    
-    for i, m in enumerate(matches):
-        schema_prefix_and_num = m.group(1).strip()
+
+    def add_schema(schema_id: str, title: str, start: int, end: int) -> None:
+        block = md[start:end].strip()
+        # Extract exemplar IDs from the block (format: - `ID`: Justification)
+        exemplar_ids = EXEMPLAR_ID_RE.findall(block)
+        schemas[schema_id] = {"title": title, "block": block, "exemplar_ids": exemplar_ids}
+
+    # Single pass: a block runs from its header to the next header (of any prefix)
+    pending = None  # (schema_id, title, start) of the block being read
+    for m in SCHEMA_HEADER_RE.finditer(md):
+        if pending:
+            add_schema(*pending, m.start())
+            pending = None
+
+        schema_prefix_and_num = m.group(1)  # [MPBC] + digits/hex, no whitespace to strip
         title = m.group(2).strip()
         
         # Extract prefix (M, P, B, or C)
@@ -368,8 +568,8 @@ def parse_schemas_from_markdown(md: str, allow_prefixes: Tuple[str, ...]=("M","P
         if schema_prefix_and_num.endswith('.'):
             # Unnumbered format (M., P.) - generate ID from title
             # Use a simple sanitization: lowercase, replace spaces with underscores, remove special chars
-            sanitized_title = re.sub(r'[^a-zA-Z0-9\s]', '', title).strip().lower()
-            sanitized_title = re.sub(r'\s+', '_', sanitized_title)[:30]  # Limit length
+            sanitized_title = _TITLE_STRIP_RE.sub('', title).strip().lower()
+            sanitized_title = _WHITESPACE_RE.sub('_', sanitized_title)[:30]  # Limit length
             if not sanitized_title:
                 sanitized_title = "unnamed"
             # Add counter to ensure uniqueness
@@ -387,24 +587,142 @@ def parse_schemas_from_markdown(md: str, allow_prefixes: Tuple[str, ...]=("M","P
             # Numbered format (M1, P3) - use as-is
             schema_id = schema_prefix_and_num
         
-        start = m.start()
-        end = matches[i+1].start() if i+1 < len(matches) else len(md)
-        block = md[start:end].strip()
-        
-        # Extract exemplar IDs from the block (format: - `ID`: Justification)
-        exemplar_ids = re.findall(r"- `([^`]+)`:", block)
-        
-        schemas[schema_id] = {"title": title, "block": block, "exemplar_ids": exemplar_ids}
+        pending = (schema_id, title, m.start())
+    if pending:
+        add_schema(*pending, len(md))
     
     if not schemas:
         raise ValueError("No schemas parsed. Ensure Schemas.md uses headings like: ## **M1. Title** or ## **P1. Title** or ## **B1. Title** or ## **C1. Title** or ## **M. Title** or ## **P. Title**")
     return schemas
 
+SCHEMA_PREFIXES: Tuple[str, ...] = ("M", "P", "B", "C")
+
+def extract_markdown_from_code_blocks(text: str) -> str:
+    """Extract markdown content from markdown code blocks."""
+    pattern = r'```markdown\s*\n(.*?)(?:\n---\s*\n)?```'
+    matches = re.findall(pattern, text, re.DOTALL)
+    if matches:
+        cleaned_matches = [m.strip() for m in matches if m.strip()]
+        if cleaned_matches:
+            extracted = '\n\n'.join(cleaned_matches)
+            if extracted.strip() and '## **' in extracted:
+                return extracted
+    return text
+
+@functools.lru_cache(maxsize=8)
+def _load_all_schemas(path: str, mtime_ns: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Parse every schema (all prefixes) in a schema file.
+    The result is pickled next to the file (<path>.pkl) together with the file's
+    mtime and a hash of its content, so later processes load it instead of
+    re-parsing the markdown. Both must match: an edit that keeps the mtime
+    (copies, checkouts, coarse filesystem clocks) still invalidates the pickle.
+    """
+    text = read_text(path)
+    source_hash = sha1_short(text)
+    pickle_path = path + ".pkl"
+    try:
+        with open(pickle_path, "rb") as f:
+            cached = pickle.load(f)
+        if cached.get("source_mtime_ns") == mtime_ns and cached.get("source_hash") == source_hash:
+            return cached["schemas"]
+    except Exception:
+        pass  # Missing or unreadable cache: parse below
+
+    schemas_md = extract_markdown_from_code_blocks(text)
+    schemas = parse_schemas_from_markdown(schemas_md, allow_prefixes=SCHEMA_PREFIXES)
+
+    tmp_path = f"{pickle_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"source_mtime_ns": mtime_ns, "source_hash": source_hash, "schemas": schemas}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, pickle_path)
+    except OSError:
+        pass  # Non-fatal: the file is just parsed again next time
+    return schemas
+
+def find_schemas_path(base_dir: str) -> str:
+    """Locate the schema file - checks multiple locations in order of preference."""
+    scripts_dir = Path(base_dir).parent
+    schema_candidates = [
+        os.path.join(base_dir, "schemas", "Schemas_NSAA.md"),  # Local schemas directory (preferred)
+        os.path.join(base_dir, "schemas", "Schemas_ESAT.md"),
+        os.path.join(base_dir, "Schemas.md"),
+        str(scripts_dir / "esat_question_generator" / "schemas" / "Schemas_NSAA.md"),  # Shared (fallback)
+    ]
+    schemas_path = next((path for path in schema_candidates if os.path.exists(path)), None)
+    if not schemas_path:
+        raise FileNotFoundError(
+            "Schema file not found. Tried:\n" + "\n".join(f"  - {path}" for path in schema_candidates)
+        )
+    return schemas_path
+
+def load_schemas(path: str, allow_prefixes: Tuple[str, ...]=("M","P")) -> Dict[str, Dict[str, Any]]:
+    """
+    Schemas from a schema file, filtered to allow_prefixes (same result as
+    parse_schemas_from_markdown). Cached until the file's mtime changes; returns
+    a copy callers may modify.
+    """
+    all_schemas = _load_all_schemas(path, os.stat(path).st_mtime_ns)
+    schemas = {sid: dict(info) for sid, info in all_schemas.items() if sid[0] in allow_prefixes}
+    if not schemas:
+        raise ValueError(f"No schemas with prefixes {tuple(allow_prefixes)} in {path}")
+    return schemas
+
 
 # ---------- Gemini client wrapper ----------
 
+# Fallback message patterns for errors that don't map to a known exception type
+_TRANSIENT_ERROR_RE = re.compile(r"503|UNAVAILABLE|overloaded|disconnected|getaddrinfo|timeout|connection", re.IGNORECASE)
+_RATE_LIMIT_ERROR_RE = re.compile(r"rate|quota|429|resource_exhausted|too many requests", re.IGNORECASE)
+
+# Separate RNG for retry jitter so it doesn't disturb the seeded global random
+# used for schema/difficulty selection
+_BACKOFF_RANDOM = random.Random()
+
+def _retry_after_seconds(e: Exception) -> Optional[float]:
+    """Seconds requested by a Retry-After header on the error's HTTP response, if any."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("Retry-After")
+    except Exception:
+        return None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)  # HTTP-date form
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _classify_api_error(e: Exception) -> Tuple[bool, bool]:
+    """Returns (is_transient, is_rate_limit) for an exception from a Gemini call."""
+    if isinstance(e, (ConnectionError, TimeoutError, socket.gaierror)):
+        return True, False
+    if genai_errors is not None:
+        if isinstance(e, genai_errors.ServerError):
+            return True, False
+        if isinstance(e, genai_errors.ClientError) and getattr(e, "code", None) == 429:
+            return False, True
+    error_str = str(e)
+    return bool(_TRANSIENT_ERROR_RE.search(error_str)), bool(_RATE_LIMIT_ERROR_RE.search(error_str))
+
+# Gemini context caches holding system prompts, shared by every LLMClient in the
+# process (run_once makes a client per item): (model, prompt sha1) -> (cache name
+# or None if the API refused it, time after which to stop using the entry)
+CONTEXT_CACHE_TTL_SECONDS = 3600
+_CONTEXT_CACHES: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+_CONTEXT_CACHES_LOCK = threading.Lock()
+
 class LLMClient:
-    def __init__(self, api_key: str, min_delay: float = 0.0, rate_limit_delay: float = 5.0):
+    def __init__(self, api_key: str, min_delay: float = 0.0, rate_limit_delay: float = 5.0,
+                 cache_path: Optional[str] = None, context_cache: bool = False):
         """
         Lightweight wrapper around the Gemini client with optional rate limiting.
 
@@ -412,21 +730,123 @@ class LLMClient:
             api_key: Gemini API key
             min_delay: Minimum delay (in seconds) between consecutive calls
             rate_limit_delay: Extra delay (in seconds) to wait after a rate-limit style error
+            cache_path: Optional SQLite file for caching responses to identical
+                (model, temperature, system, user) requests across runs; only calls
+                made with generate(..., cache=True) use it
+            context_cache: Send system prompts through Gemini context caches (created
+                on first use, shared across clients) instead of inline on every call
         """
         self.api_key = api_key
         self.client = None
         self.last_usage = None  # Store last API call's token usage
         self.total_usage = {"prompt_tokens": 0, "candidates_tokens": 0, "total_tokens": 0}  # Accumulate total usage
+        self._usage_lock = threading.Lock()  # generate() may run on several threads (parallel assessment)
         self.min_delay = float(min_delay) if min_delay is not None else 0.0
         self.rate_limit_delay = float(rate_limit_delay) if rate_limit_delay is not None else 5.0
         self._last_call_time: float = 0.0
+        # Serializes the min_delay check and _last_call_time updates, so threads
+        # sharing one client (label_existing_questions, parallel assessment) are
+        # still spaced min_delay apart
+        self._throttle_lock = threading.Lock()
+        self.cache_path = cache_path
+        self.cache_hits = 0
+        self.context_cache = context_cache
+        # Called with (model, text) for every response; run_once uses it to keep raw
+        # model output in a sidecar file rather than on the parsed objects
+        self.on_response: Optional[Callable[[str, str], None]] = None
+        if self.cache_path:
+            try:
+                conn = sqlite3.connect(self.cache_path, timeout=30)
+                try:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS llm_responses "
+                        "(key TEXT PRIMARY KEY, model TEXT, text TEXT NOT NULL, created_at TEXT)"
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"[DEBUG] LLM response cache disabled ({e})")
+                self.cache_path = None
         if _GENAI_AVAILABLE:
             self.client = genai.Client(api_key=api_key)
 
-    def generate(self, model: str, system_prompt: str, user_prompt: str, temperature: float=0.6, max_retries: int=3) -> str:
+    def _cache_key(self, model: str, system_prompt: str, user_prompt: str, temperature: float) -> Optional[str]:
+        if not self.cache_path:
+            return None
+        h = hashlib.sha1()
+        for part in (model, repr(float(temperature)), system_prompt, user_prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def _cache_execute(self, sql: str, params: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+        """Run one statement against the response cache; cache errors are never fatal."""
+        try:
+            conn = sqlite3.connect(self.cache_path, timeout=30)
+            try:
+                row = conn.execute(sql, params).fetchone()
+                conn.commit()
+                return row
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"[DEBUG] LLM response cache error: {e}")
+            return None
+
+    def discard_cached(self, model: str, system_prompt: str, user_prompt: str, temperature: float=0.6) -> None:
+        """Drop a cached response (e.g. one the caller couldn't parse) so the next call hits the API."""
+        key = self._cache_key(model, system_prompt, user_prompt, temperature)
+        if key:
+            self._cache_execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+
+    def _context_cache_name(self, model: str, system_prompt: str) -> Optional[str]:
+        """
+        Name of the context cache holding system_prompt for model, created on first
+        use and again shortly before it expires. None when context caching is off or
+        the API refused the cache (e.g. a prompt below the model's minimum cache
+        size); the prompt is then sent inline.
+        """
+        if not self.context_cache:
+            return None
+        key = (model, hashlib.sha1(system_prompt.encode("utf-8")).hexdigest())
+        with _CONTEXT_CACHES_LOCK:
+            name, use_until = _CONTEXT_CACHES.get(key, (None, 0.0))
+            if time.time() < use_until:
+                return name
+            # Reserve the entry so other threads don't create the same cache meanwhile;
+            # they keep using the old cache (still valid for its last minute) or send
+            # the prompt inline until this one is stored
+            _CONTEXT_CACHES[key] = (name, time.time() + 60)
+        # The API call runs outside the lock so it doesn't hold up other prompts
+        try:
+            name = self.client.caches.create(
+                model=model,
+                config={"system_instruction": system_prompt, "ttl": f"{CONTEXT_CACHE_TTL_SECONDS}s"},
+            ).name
+            print(f"[DEBUG] Created context cache {name} for model {model}")
+        except Exception as e:
+            print(f"[DEBUG] Context cache not used for model {model}: {str(e)[:200]}")
+            name = None
+        with _CONTEXT_CACHES_LOCK:
+            # Stop using it a minute before the TTL so requests never reference an
+            # expired cache; a refusal is remembered for as long
+            _CONTEXT_CACHES[key] = (name, time.time() + CONTEXT_CACHE_TTL_SECONDS - 60)
+        return name
+
+    def _drop_context_cache(self, model: str, system_prompt: str) -> None:
+        """Send this prompt inline from now on (its cache failed a request)."""
+        key = (model, hashlib.sha1(system_prompt.encode("utf-8")).hexdigest())
+        with _CONTEXT_CACHES_LOCK:
+            _CONTEXT_CACHES[key] = (None, time.time() + CONTEXT_CACHE_TTL_SECONDS)
+
+    def generate(self, model: str, system_prompt: str, user_prompt: str, temperature: float=0.6, max_retries: int=3,
+                 cache: bool = False, max_output_tokens: Optional[int] = None) -> str:
         """
         Returns model output as text.
         Retries on transient errors (503, network issues) with exponential backoff.
+        With cache=True, an identical earlier request is answered from the response cache.
+        max_output_tokens caps the response length (None leaves the model default).
         """
         if not self.client:
             raise RuntimeError(
@@ -434,16 +854,32 @@ class LLMClient:
                 "or adapt the code to your preferred LLM client."
             )
 
+        cache_key = self._cache_key(model, system_prompt, user_prompt, temperature) if cache else None
+        if cache_key:
+            row = self._cache_execute("SELECT text FROM llm_responses WHERE key = ?", (cache_key,))
+            if row:
+                self.cache_hits += 1
+                self.last_usage = None
+                print(f"[DEBUG] LLMClient.generate - Model: {model}, served from response cache")
+                if self.on_response:
+                    self.on_response(model, row[0])
+                return row[0]
+
         last_error = None
         for attempt in range(max_retries):
+            cached_content = None
             try:
-                # Respect minimum delay between calls (simple client-side rate limiting)
-                if self.min_delay > 0 and self._last_call_time > 0:
-                    elapsed = time.time() - self._last_call_time
-                    if elapsed < self.min_delay:
-                        sleep_time = self.min_delay - elapsed
-                        print(f"[DEBUG] Respecting min_delay={self.min_delay}s, sleeping for {sleep_time:.2f}s")
-                        time.sleep(sleep_time)
+                # Respect minimum delay between calls (simple client-side rate limiting).
+                # Waiting threads queue on the lock; each claims its slot before releasing it.
+                if self.min_delay > 0:
+                    with self._throttle_lock:
+                        if self._last_call_time > 0:
+                            elapsed = time.time() - self._last_call_time
+                            if elapsed < self.min_delay:
+                                sleep_time = self.min_delay - elapsed
+                                print(f"[DEBUG] Respecting min_delay={self.min_delay}s, sleeping for {sleep_time:.2f}s")
+                                time.sleep(sleep_time)
+                        self._last_call_time = time.time()
 
                 # Log API call details (for debugging)
                 api_key_preview = f"{self.api_key[:8]}...{self.api_key[-4:]}" if len(self.api_key) > 12 else "***"
@@ -451,17 +887,23 @@ class LLMClient:
                 print(f"[DEBUG] API Key preview: {api_key_preview}, Length: {len(self.api_key)}")
                 
                 # Gemini API: send system as instruction, user as contents
-                # The SDK supports `config={"system_instruction": ...}`.
+                # The SDK supports `config={"system_instruction": ...}`, or a context
+                # cache that already holds the system instruction.
+                cached_content = self._context_cache_name(model, system_prompt)
+                if cached_content:
+                    config = {"cached_content": cached_content, "temperature": temperature}
+                else:
+                    config = {"system_instruction": system_prompt, "temperature": temperature}
+                if max_output_tokens:
+                    config["max_output_tokens"] = max_output_tokens
                 resp = self.client.models.generate_content(
                     model=model,
                     contents=user_prompt,
-                    config={
-                        "system_instruction": system_prompt,
-                        "temperature": temperature,
-                    },
+                    config=config,
                 )
                 # Record call time for min_delay handling
-                self._last_call_time = time.time()
+                with self._throttle_lock:
+                    self._last_call_time = time.time()
 
                 print(f"[DEBUG] ✓ API call successful for model {model}")
                 # Capture usage metadata if available
@@ -483,12 +925,21 @@ class LLMClient:
                 if usage_info and any(usage_info.values()):
                     self.last_usage = usage_info
                     # Accumulate total usage
-                    for key in self.total_usage:
-                        if usage_info.get(key) is not None:
-                            self.total_usage[key] += usage_info[key]
+                    with self._usage_lock:
+                        for key in self.total_usage:
+                            if usage_info.get(key) is not None:
+                                self.total_usage[key] += usage_info[key]
                 
                 # The SDK returns resp.text convenience property
-                return (resp.text or "").strip()
+                text = (resp.text or "").strip()
+                if cache_key and text:
+                    self._cache_execute(
+                        "INSERT OR REPLACE INTO llm_responses (key, model, text, created_at) VALUES (?, ?, ?, ?)",
+                        (cache_key, model, text, now_iso()),
+                    )
+                if self.on_response:
+                    self.on_response(model, text)
+                return text
             except Exception as e:
                 last_error = e
                 error_str = str(e)
@@ -507,35 +958,32 @@ class LLMClient:
                     # Don't retry on API key errors - they won't succeed
                     raise
                 
-                # Check if it's a transient error that we should retry
-                is_transient = (
-                    "503" in error_str or 
-                    "UNAVAILABLE" in error_str or
-                    "overloaded" in error_str.lower() or
-                    "disconnected" in error_str.lower() or
-                    "getaddrinfo" in error_str.lower() or
-                    "timeout" in error_str.lower() or
-                    "connection" in error_str.lower()
-                )
+                # Check if it's a transient error that we should retry, or a rate limit
+                is_transient, is_rate_limit = _classify_api_error(e)
                 
-                # Check for rate limit errors specifically
-                is_rate_limit = (
-                    "rate" in error_str.lower() or 
-                    "quota" in error_str.lower() or
-                    "429" in error_str or
-                    "resource_exhausted" in error_str.lower() or
-                    "too many requests" in error_str.lower()
-                )
+                if cached_content and not (is_transient or is_rate_limit):
+                    # The cache may have been deleted or expired server-side: retry
+                    # with the system prompt inline
+                    print(f"[DEBUG] Request using context cache {cached_content} failed, sending the prompt inline")
+                    self._drop_context_cache(model, system_prompt)
+                    if attempt < max_retries - 1:
+                        continue
                 
                 if (is_transient or is_rate_limit) and attempt < max_retries - 1:
-                    # Exponential backoff: wait 2^attempt seconds
-                    wait_time = 2 ** attempt
+                    # Exponential backoff with full jitter (capped at 30s), so concurrent
+                    # pipelines don't all retry at the same moment
+                    wait_time = _BACKOFF_RANDOM.uniform(0, min(2 ** attempt, 30))
                     # If it's a rate-limit error, use longer delay
                     if is_rate_limit:
                         wait_time = max(wait_time, self.rate_limit_delay)
+                    # Never retry sooner than the server asked us to
+                    retry_after = _retry_after_seconds(e)
+                    if retry_after is not None:
+                        wait_time = max(wait_time, retry_after)
+                    if is_rate_limit:
                         print(f"[WARN] Rate limit hit, waiting {wait_time:.1f}s before retry {attempt + 1}/{max_retries}")
                     else:
-                        print(f"[DEBUG] Transient error detected, retrying in {wait_time} seconds...")
+                        print(f"[DEBUG] Transient error detected, retrying in {wait_time:.1f} seconds...")
                     time.sleep(wait_time)
                     continue
                 else:
@@ -560,6 +1008,31 @@ class Prompts:
     retry_controller: str
     verifier: str  # Contains if statements for all subjects
     style_checker: str  # Contains if statements for all subjects
+    
+    # Per-subject prompts prepared once by load_prompts (subject -> prompt text):
+    # the verifier filtered to that subject's section, and the subject's style checker file
+    verifier_by_subject: Dict[str, str] = field(default_factory=dict)
+    style_checker_by_subject: Dict[str, str] = field(default_factory=dict)
+
+
+STYLE_CHECKER_FILES = {
+    "physics": "Style_checker_physics.md",
+    "chemistry": "Style_checker_chemistry.md",
+    "biology": "Style_checker_biology.md",
+    "mathematics": "Style_checker.md",
+}
+
+def load_style_checker_prompt(prompt_dir: str, subject: str) -> Optional[str]:
+    """Read the subject's style checker file (by_subject_prompts/ or by_subject_prompts/old/)."""
+    style_checker_filename = STYLE_CHECKER_FILES.get(subject, "Style_checker.md")
+    style_checker_path = os.path.join(prompt_dir, style_checker_filename)
+    if os.path.exists(style_checker_path):
+        return read_text(style_checker_path)
+    # Fallback to old location
+    old_style_path = os.path.join(prompt_dir, "old", style_checker_filename)
+    if os.path.exists(old_style_path):
+        return read_text(old_style_path)
+    return None
 
 
 def load_prompts(base_dir: str) -> Prompts:
@@ -645,20 +1118,12 @@ def load_prompts(base_dir: str) -> Prompts:
         if not os.path.exists(subject_path):
             continue
         
-        # Find and load Designer file
-        designer_files = [f for f in os.listdir(subject_path) if 'Designer' in f and f.endswith('.md')]
-        if designer_files:
-            designers[subject_key] = read_text(os.path.join(subject_path, designer_files[0]))
-        
-        # Find and load Implementer file
-        impl_files = [f for f in os.listdir(subject_path) if 'Implementer' in f and f.endswith('.md')]
-        if impl_files:
-            implementers[subject_key] = read_text(os.path.join(subject_path, impl_files[0]))
-        
-        # Find and load Classifier file
-        class_files = [f for f in os.listdir(subject_path) if 'Classifier' in f and f.endswith('.md')]
-        if class_files:
-            classifiers[subject_key] = read_text(os.path.join(subject_path, class_files[0]))
+        # List the folder once, then pick the Designer / Implementer / Classifier files from it
+        md_files = [f for f in os.listdir(subject_path) if f.endswith('.md')]
+        for kind, loaded in (('Designer', designers), ('Implementer', implementers), ('Classifier', classifiers)):
+            kind_file = next((f for f in md_files if kind in f), None)
+            if kind_file:
+                loaded[subject_key] = read_text(os.path.join(subject_path, kind_file))
     
     # Load universal prompts (fallback if Math1-specific not found)
     retry_controller_path = os.path.join(prompt_dir, "Retry_controller.md")
@@ -694,26 +1159,97 @@ def load_prompts(base_dir: str) -> Prompts:
     Prompts.style_checker_math1 = style_checker_math1 or ""
     Prompts.tag_labeler_math1 = tag_labeler_math1
     
+    verifier_by_subject = {subject_key: filter_prompt_by_subject(verifier_math1 or "", subject_key)
+                           for subject_key in subjects}
+    style_checker_by_subject = {}
+    for subject_key in subjects:
+        style_prompt = load_style_checker_prompt(prompt_dir, subject_key)
+        if style_prompt:
+            style_checker_by_subject[subject_key] = style_prompt
+    
     return Prompts(
         designer=designers,
         implementer=implementers,
         classifier=classifiers,
         retry_controller=retry_controller_math1 or "",
         verifier=verifier_math1 or "",
-        style_checker=style_checker_math1 or ""
+        style_checker=style_checker_math1 or "",
+        verifier_by_subject=verifier_by_subject,
+        style_checker_by_subject=style_checker_by_subject,
+    )
+
+
+def _prompt_files_signature(base_dir: str) -> Tuple[Tuple[str, int], ...]:
+    """(path, mtime) of every file under by_subject_prompts, used as a cache key."""
+    prompt_dir = os.path.join(base_dir, "by_subject_prompts")
+    signature = []
+    for root, _dirs, files in os.walk(prompt_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            signature.append((path, os.stat(path).st_mtime_ns))
+    return tuple(sorted(signature))
+
+_MATH1_PROMPT_ATTRS = (
+    "sibling_mode", "far_mode", "format_fixer_math1", "retry_controller_math1",
+    "verifier_math1", "style_checker_math1", "tag_labeler_math1",
+)
+
+_prompts_cache: Dict[str, Tuple[Tuple[Tuple[str, int], ...], Prompts, Dict[str, Any]]] = {}
+_prompts_cache_lock = threading.Lock()
+
+def load_prompts_cached(base_dir: str) -> Prompts:
+    """load_prompts, reusing the previous result while no prompt file has changed."""
+    signature = _prompt_files_signature(base_dir)
+    with _prompts_cache_lock:
+        cached = _prompts_cache.get(base_dir)
+        if cached and cached[0] == signature:
+            _, prompts, math1_attrs = cached
+            # load_prompts stores the Math1 prompts on the class; restore this base_dir's
+            for name, value in math1_attrs.items():
+                setattr(Prompts, name, value)
+        else:
+            prompts = load_prompts(base_dir)
+            math1_attrs = {name: getattr(Prompts, name) for name in _MATH1_PROMPT_ATTRS}
+            _prompts_cache[base_dir] = (signature, prompts, math1_attrs)
+    return Prompts(
+        designer=dict(prompts.designer),
+        implementer=dict(prompts.implementer),
+        classifier=dict(prompts.classifier),
+        retry_controller=prompts.retry_controller,
+        verifier=prompts.verifier,
+        style_checker=prompts.style_checker,
+        verifier_by_subject=dict(prompts.verifier_by_subject),
+        style_checker_by_subject=dict(prompts.style_checker_by_subject),
     )
 
 
 # ---------- Pipeline steps ----------
 
-def choose_schema(schemas: Dict[str, Dict[str, str]], cfg: RunConfig) -> str:
+# Style checker and tag classifier calls judge or label a fixed question, so they
+# run greedy: no sampling variety is wanted, and identical requests get identical
+# (response-cacheable) answers. The verifier keeps its own temperature.
+JUDGE_TEMPERATURE = 0.0
+VERIFIER_TEMPERATURE = 0.2
+
+# Runs style checker calls next to the verifier (RunConfig.parallel_assessment)
+_ASSESSMENT_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="style-check")
+
+def choose_schema(schemas: Dict[str, Dict[str, str]], cfg: RunConfig, rng: Optional[random.Random] = None) -> str:
+    rng = rng or random
     ids = [sid for sid in schemas.keys() if sid.startswith(cfg.allow_schema_prefixes)]
     if not ids:
         raise ValueError("No schemas available after prefix filter.")
     if cfg.schema_weights:
         weights = [cfg.schema_weights.get(sid, 1.0) for sid in ids]
-        return random.choices(ids, weights=weights, k=1)[0]
-    return random.choice(ids)
+        return rng.choices(ids, weights=weights, k=1)[0]
+    return rng.choice(ids)
+
+_SCHEMA_NUMBER_RE = re.compile(r'\d+')
+
+def _schema_number(schema_id: str) -> int:
+    """Number in a schema id (M12 -> 12); 999 for ids without one, so they sort last."""
+    m = _SCHEMA_NUMBER_RE.search(schema_id)
+    return int(m.group()) if m else 999
 
 def get_schemas_sorted_by_category(schemas: Dict[str, Dict[str, str]], category_order: List[str] = None) -> List[Tuple[str, str]]:
     """
@@ -740,7 +1276,7 @@ def get_schemas_sorted_by_category(schemas: Dict[str, Dict[str, str]], category_
     
     # Sort schemas within each category by number
     for prefix in by_category:
-        by_category[prefix].sort(key=lambda sid: int(re.search(r'\d+', sid).group()) if re.search(r'\d+', sid) else 999)
+        by_category[prefix].sort(key=_schema_number)
     
     # Build sorted list
     result = []
@@ -751,12 +1287,32 @@ def get_schemas_sorted_by_category(schemas: Dict[str, Dict[str, str]], category_
     
     return result
 
-def choose_difficulty(cfg: RunConfig) -> str:
+def choose_difficulty(cfg: RunConfig, rng: Optional[random.Random] = None) -> str:
+    rng = rng or random
     if not cfg.difficulty_weights:
-        return random.choice(["Easy", "Medium", "Hard"])
+        return rng.choice(["Easy", "Medium", "Hard"])
     diffs = list(cfg.difficulty_weights.keys())
     weights = [cfg.difficulty_weights[d] for d in diffs]
-    return random.choices(diffs, weights=weights, k=1)[0]
+    return rng.choices(diffs, weights=weights, k=1)[0]
+
+def plan_items(schemas: Dict[str, Dict[str, str]], cfg: RunConfig, n: int) -> List[Tuple[str, str]]:
+    """
+    Draws (schema_id, difficulty) for n items at once, weighted like choose_schema and
+    choose_difficulty. Uses its own RNG seeded from cfg.seed, so a seeded batch is
+    reproducible without every item getting the same pick.
+    """
+    rng = random.Random(cfg.seed)
+    ids = [sid for sid in schemas.keys() if sid.startswith(cfg.allow_schema_prefixes)]
+    if not ids:
+        raise ValueError("No schemas available after prefix filter.")
+    schema_weights = [cfg.schema_weights.get(sid, 1.0) for sid in ids] if cfg.schema_weights else None
+    if cfg.difficulty_weights:
+        diffs = list(cfg.difficulty_weights.keys())
+        diff_weights = [cfg.difficulty_weights[d] for d in diffs]
+    else:
+        diffs, diff_weights = ["Easy", "Medium", "Hard"], None
+    return list(zip(rng.choices(ids, weights=schema_weights, k=n),
+                    rng.choices(diffs, weights=diff_weights, k=n)))
 
 def apply_mode_injection(llm: LLMClient, prompts: Prompts, models: ModelsConfig, 
                          idea_plan: Dict[str, Any], mode: str) -> Dict[str, Any]:
@@ -789,7 +1345,7 @@ def apply_mode_injection(llm: LLMClient, prompts: Prompts, models: ModelsConfig,
     
     # Apply mode injection
     user = f"""Original idea_plan (YAML):
-{yaml.safe_dump(idea_plan, sort_keys=False)}
+{prompt_yaml(idea_plan, sort_keys=False)}
 
 Apply {mode.upper()} mode injection to this idea_plan.
 Return the modified idea_plan in YAML format with variation_mode set to "{mode}".
@@ -810,11 +1366,10 @@ Return the modified idea_plan in YAML format with variation_mode set to "{mode}"
     
     # Ensure variation_mode is set
     obj["variation_mode"] = mode
-    obj["_raw_text"] = txt
     return obj
 
 
-def designer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, schema_block: str, schema_id: str, difficulty: str, exemplar_ids: List[str] = None, variation_mode: str = "base") -> Dict[str, Any]:
+def designer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, schema_block: str, schema_id: str, difficulty: str, exemplar_ids: List[str] = None, variation_mode: str = "base", rng: Optional[random.Random] = None) -> Dict[str, Any]:
     """
     Call Designer to create an idea_plan.
     
@@ -837,7 +1392,7 @@ def designer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, schema
     exemplar_section = ""
     if exemplar_ids:
         # Sample 1-2 exemplars (as per new pipeline spec)
-        sample_ids = random.sample(exemplar_ids, min(len(exemplar_ids), 2))
+        sample_ids = (rng or random).sample(exemplar_ids, min(len(exemplar_ids), 2))
         texts = fetch_exemplar_texts(sample_ids)
         if texts:
             exemplar_section = "\n\n# AUTHENTIC NSAA SECTION 1 MATHEMATICS REFERENCES\n"
@@ -886,7 +1441,6 @@ Define ONE dominant reasoning move."""
     if schema_id not in out_schema:
         obj["_warning"] = f"Designer schema_id '{out_schema}' does not include expected '{schema_id}'."
     
-    obj["_raw_text"] = txt
     return obj
 
 def format_fixer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig,
@@ -937,7 +1491,7 @@ def format_fixer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig,
         error_report += f"\nYAML Parsing Errors:\n{yaml_errors}\n"
     
     user = f"""implemented_question_yaml: |
-{yaml.safe_dump(question_obj, sort_keys=False, default_flow_style=False)}
+{prompt_yaml(question_obj, sort_keys=False, default_flow_style=False)}
 
 """
     if error_report:
@@ -985,11 +1539,10 @@ def format_fixer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig,
         # Invalid output, return original
         return question_obj
     
-    fixed_obj["_raw_text"] = txt
     return fixed_obj
 
 
-def implementer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, idea_plan: Dict[str, Any], exemplar_ids: List[str] = None) -> Dict[str, Any]:
+def implementer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, idea_plan: Dict[str, Any], exemplar_ids: List[str] = None, rng: Optional[random.Random] = None) -> Dict[str, Any]:
     """
     Call Implementer to build full MCQ from idea_plan.
     
@@ -1010,7 +1563,7 @@ def implementer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, ide
     # Add NSAA references if available
     references_section = ""
     if exemplar_ids:
-        sample_ids = random.sample(exemplar_ids, min(len(exemplar_ids), 2))
+        sample_ids = (rng or random).sample(exemplar_ids, min(len(exemplar_ids), 2))
         texts = fetch_exemplar_texts(sample_ids)
         if texts:
             references_section = "\n\n# NSAA SECTION 1 MATHEMATICS REFERENCES (Calibration Anchors)\n"
@@ -1020,7 +1573,7 @@ def implementer_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, ide
             references_section += "Do NOT copy: distinctive numbers, structural fingerprints, wording, constants, transformation chains.\n"
     
     user = f"""idea_plan (YAML):
-{yaml.safe_dump(idea_plan, sort_keys=False)}{references_section}
+{prompt_yaml(idea_plan, sort_keys=False)}{references_section}
 
 Implement this idea_plan into a complete ESAT Mathematics 1 multiple-choice question.
 Return raw YAML only (no markdown fences)."""
@@ -1068,10 +1621,9 @@ Return raw YAML only (no markdown fences)."""
             f"Raw output:\n{txt[:500]}..."
         )
     
-    obj["_raw_text"] = txt
     return obj
 
-def verifier_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_obj: Dict[str, Any], schema_id: str, designer_plan: Optional[Dict[str, Any]] = None, exemplar_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+def verifier_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_obj: Dict[str, Any], schema_id: str, designer_plan: Optional[Dict[str, Any]] = None, exemplar_ids: Optional[List[str]] = None, rng: Optional[random.Random] = None) -> Dict[str, Any]:
     """
     Call Verifier to check question validity.
     
@@ -1087,6 +1639,19 @@ def verifier_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, questi
     Returns:
         Verifier report with verdict (PASS/FAIL) and details
     """
+    verifier_prompt, user = _verifier_request(prompts, question_obj, schema_id, designer_plan, exemplar_ids, rng)
+    txt = llm.generate(model=models.verifier, system_prompt=verifier_prompt, user_prompt=user, temperature=VERIFIER_TEMPERATURE, cache=True)
+    obj = safe_yaml_load(txt)
+    if not isinstance(obj, dict) or "verdict" not in obj:
+        llm.discard_cached(models.verifier, verifier_prompt, user, temperature=VERIFIER_TEMPERATURE)
+        raise ValueError(f"Verifier output invalid YAML/object. Raw output:\n{txt}")
+    return obj
+
+def _verifier_request(prompts: Prompts, question_obj: Dict[str, Any], schema_id: str,
+                      designer_plan: Optional[Dict[str, Any]] = None,
+                      exemplar_ids: Optional[List[str]] = None,
+                      rng: Optional[random.Random] = None) -> Tuple[str, str]:
+    """(system prompt, user prompt) for a Verifier call."""
     subject = get_subject_from_schema(schema_id)
     
     # Use Math1-specific verifier if available
@@ -1094,15 +1659,17 @@ def verifier_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, questi
     if subject == "mathematics" and hasattr(prompts, 'verifier_math1') and prompts.verifier_math1:
         verifier_prompt = prompts.verifier_math1
     else:
-        # Filter verifier prompt to include only relevant subject instructions
-        verifier_prompt = filter_prompt_by_subject(prompts.verifier, subject)
+        # Verifier prompt filtered to the relevant subject instructions (done by load_prompts)
+        verifier_prompt = prompts.verifier_by_subject.get(subject)
+        if verifier_prompt is None:
+            verifier_prompt = filter_prompt_by_subject(prompts.verifier, subject)
     
     # Build user prompt with designer_plan if available (new Math1 pipeline)
     if designer_plan and subject == "mathematics":
         # New Math1 pipeline: pass designer_plan and implemented_question separately
         references_section = ""
         if exemplar_ids:
-            sample_ids = random.sample(exemplar_ids, min(len(exemplar_ids), 2))
+            sample_ids = (rng or random).sample(exemplar_ids, min(len(exemplar_ids), 2))
             texts = fetch_exemplar_texts(sample_ids)
             if texts:
                 references_section = "\n\n# NSAA/ENGAA/ESAT REFERENCES (Optional)\n"
@@ -1110,10 +1677,10 @@ def verifier_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, questi
                     references_section += f"Reference {i+1}:\n\"\"\"\n{text}\n\"\"\"\n\n"
         
         user = f"""designer_plan (YAML):
-{yaml.safe_dump(designer_plan, sort_keys=False)}
+{prompt_yaml(designer_plan, sort_keys=False)}
 
 implemented_question (YAML):
-{yaml.safe_dump(question_obj, sort_keys=False)}
+{prompt_yaml(question_obj, sort_keys=False)}
 {references_section}
 
 Verify the implemented question against the designer plan."""
@@ -1123,16 +1690,10 @@ Verify the implemented question against the designer plan."""
             "subject": subject,
             **question_obj
         }
-        user = "Question package to verify (YAML):\n" + yaml.safe_dump(question_with_subject, sort_keys=False)
-    
-    txt = llm.generate(model=models.verifier, system_prompt=verifier_prompt, user_prompt=user, temperature=0.2)
-    obj = safe_yaml_load(txt)
-    if not isinstance(obj, dict) or "verdict" not in obj:
-        raise ValueError(f"Verifier output invalid YAML/object. Raw output:\n{txt}")
-    obj["_raw_text"] = txt
-    return obj
+        user = "Question package to verify (YAML):\n" + prompt_yaml(question_with_subject, sort_keys=False)
+    return verifier_prompt, user
 
-def style_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_obj: Dict[str, Any], schema_id: str, verifier_obj: Optional[Dict[str, Any]]=None, designer_plan: Optional[Dict[str, Any]]=None, exemplar_ids: Optional[List[str]]=None) -> Dict[str, Any]:
+def style_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_obj: Dict[str, Any], schema_id: str, verifier_obj: Optional[Dict[str, Any]]=None, designer_plan: Optional[Dict[str, Any]]=None, exemplar_ids: Optional[List[str]]=None, rng: Optional[random.Random]=None) -> Dict[str, Any]:
     """
     Call Style Checker to verify authenticity and difficulty calibration.
     
@@ -1149,6 +1710,21 @@ def style_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_
     Returns:
         Style checker report with verdict and style score
     """
+    style_checker_prompt, user = _style_request(prompts, question_obj, schema_id, verifier_obj, designer_plan, exemplar_ids, rng)
+    txt = llm.generate(model=models.style_judge, system_prompt=style_checker_prompt, user_prompt=user, temperature=JUDGE_TEMPERATURE,
+                       cache=True, max_output_tokens=models.style_max_output_tokens)
+    obj = safe_yaml_load(txt)
+    if not isinstance(obj, dict) or "verdict" not in obj:
+        llm.discard_cached(models.style_judge, style_checker_prompt, user, temperature=JUDGE_TEMPERATURE)
+        raise ValueError(f"Style checker output invalid YAML/object. Raw output:\n{txt}")
+    return obj
+
+def _style_request(prompts: Prompts, question_obj: Dict[str, Any], schema_id: str,
+                   verifier_obj: Optional[Dict[str, Any]] = None,
+                   designer_plan: Optional[Dict[str, Any]] = None,
+                   exemplar_ids: Optional[List[str]] = None,
+                   rng: Optional[random.Random] = None) -> Tuple[str, str]:
+    """(system prompt, user prompt) for a Style Checker call."""
     subject = get_subject_from_schema(schema_id)
     
     # Use Math1-specific style checker if available
@@ -1156,24 +1732,11 @@ def style_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_
     if subject == "mathematics" and hasattr(prompts, 'style_checker_math1') and prompts.style_checker_math1:
         style_checker_prompt = prompts.style_checker_math1
     else:
-        # Load subject-specific style checker file
-        prompt_dir = os.path.join(os.path.dirname(__file__), "by_subject_prompts")
-        style_checker_file_map = {
-            "physics": "Style_checker_physics.md",
-            "chemistry": "Style_checker_chemistry.md",
-            "biology": "Style_checker_biology.md",
-            "mathematics": "Style_checker.md",
-        }
-        
-        style_checker_filename = style_checker_file_map.get(subject, "Style_checker.md")
-        style_checker_path = os.path.join(prompt_dir, style_checker_filename)
-        if os.path.exists(style_checker_path):
-            style_checker_prompt = read_text(style_checker_path)
-        else:
-            # Fallback to old location
-            old_style_path = os.path.join(prompt_dir, "old", style_checker_filename)
-            if os.path.exists(old_style_path):
-                style_checker_prompt = read_text(old_style_path)
+        # Subject-specific style checker file (read by load_prompts)
+        style_checker_prompt = prompts.style_checker_by_subject.get(subject)
+        if not style_checker_prompt:
+            prompt_dir = os.path.join(os.path.dirname(__file__), "by_subject_prompts")
+            style_checker_prompt = load_style_checker_prompt(prompt_dir, subject)
     
     if not style_checker_prompt:
         raise ValueError(f"Style checker prompt not found for subject: {subject}")
@@ -1183,7 +1746,7 @@ def style_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_
         # New Math1 pipeline: pass designer_plan, implemented_question, and references separately
         references_section = ""
         if exemplar_ids:
-            sample_ids = random.sample(exemplar_ids, min(len(exemplar_ids), 2))
+            sample_ids = (rng or random).sample(exemplar_ids, min(len(exemplar_ids), 2))
             texts = fetch_exemplar_texts(sample_ids)
             if texts:
                 references_section = "\n\n# NSAA SECTION 1 MATHEMATICS REFERENCES\n"
@@ -1191,10 +1754,10 @@ def style_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_
                     references_section += f"Reference {i+1}:\n\"\"\"\n{text}\n\"\"\"\n\n"
         
         user = f"""designer_plan (YAML):
-{yaml.safe_dump(designer_plan, sort_keys=False)}
+{prompt_yaml(designer_plan, sort_keys=False)}
 
 implemented_question (YAML):
-{yaml.safe_dump(question_obj, sort_keys=False)}
+{prompt_yaml(question_obj, sort_keys=False)}
 {references_section}
 
 Check style authenticity and difficulty calibration."""
@@ -1206,14 +1769,44 @@ Check style authenticity and difficulty calibration."""
         }
         if verifier_obj:
             payload["verifier_report"] = verifier_obj
-        user = "Package to style-check (YAML):\n" + yaml.safe_dump(payload, sort_keys=False)
+        user = "Package to style-check (YAML):\n" + prompt_yaml(payload, sort_keys=False)
+    return style_checker_prompt, user
+
+ASSESS_OUTPUT_INSTRUCTIONS = """# OUTPUT FOR THIS CALL
+You are acting as BOTH reviewers above in a single pass.
+Return raw YAML only, with exactly two top-level keys:
+verifier: <the complete report the VERIFIER instructions ask for, including verdict>
+style: <the complete report the STYLE CHECKER instructions ask for, including verdict>"""
+
+def assess_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_obj: Dict[str, Any], schema_id: str, designer_plan: Optional[Dict[str, Any]] = None, exemplar_ids: Optional[List[str]] = None, rng: Optional[random.Random] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Run the Verifier and Style Checker as one LLM call (RunConfig.fuse_assessment).
+    
+    Saves a network round-trip per attempt; unlike the separate path, the style
+    checker does not see the verifier's report.
     
-    txt = llm.generate(model=models.style_judge, system_prompt=style_checker_prompt, user_prompt=user, temperature=0.3)
+    Returns:
+        (verifier_report, style_report), each with verdict and details
+    """
+    verifier_prompt, verifier_user = _verifier_request(prompts, question_obj, schema_id, designer_plan, exemplar_ids, rng)
+    style_checker_prompt, style_user = _style_request(prompts, question_obj, schema_id, None, designer_plan, exemplar_ids, rng)
+    system = (
+        "# VERIFIER INSTRUCTIONS\n" + verifier_prompt
+        + "\n\n---STYLE BLOCK---\n\n# STYLE CHECKER INSTRUCTIONS\n" + style_checker_prompt
+        + "\n\n---\n\n" + ASSESS_OUTPUT_INSTRUCTIONS
+    )
+    user = "# VERIFIER INPUT\n" + verifier_user + "\n\n# STYLE CHECKER INPUT\n" + style_user
+
+    txt = llm.generate(model=models.verifier, system_prompt=system, user_prompt=user, temperature=VERIFIER_TEMPERATURE, cache=True)
     obj = safe_yaml_load(txt)
-    if not isinstance(obj, dict) or "verdict" not in obj:
-        raise ValueError(f"Style checker output invalid YAML/object. Raw output:\n{txt}")
-    obj["_raw_text"] = txt
-    return obj
+    reports = []
+    for key in ("verifier", "style"):
+        report = obj.get(key) if isinstance(obj, dict) else None
+        if not isinstance(report, dict) or "verdict" not in report:
+            llm.discard_cached(models.verifier, system, user, temperature=VERIFIER_TEMPERATURE)
+            raise ValueError(f"Assessment output missing '{key}' report with a verdict. Raw output:\n{txt}")
+        reports.append(report)
+    return reports[0], reports[1]
 
 def classifier_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, question_obj: Dict[str, Any], 
                     schema_id: str, curriculum_parser) -> Dict[str, Any]:
@@ -1240,7 +1833,7 @@ def classifier_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, ques
     available_topics = curriculum_parser.get_available_topics_for_schema(schema_id)
     
     # Format topics
-    topics_text = yaml.safe_dump({
+    topics_text = yaml_dump({
         "available_topics": [
             {
                 "code": topic["code"],
@@ -1256,7 +1849,7 @@ def classifier_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, ques
 {topics_text}
 
 Question package (YAML):
-{yaml.safe_dump(question_obj, sort_keys=False)}
+{prompt_yaml(question_obj, sort_keys=False)}
 
 Analyze the question and assign appropriate curriculum tags."""
     
@@ -1265,7 +1858,8 @@ Analyze the question and assign appropriate curriculum tags."""
         model=model,
         system_prompt=subject_prompts['classifier'],  # Subject-specific
         user_prompt=user,
-        temperature=0.3
+        temperature=JUDGE_TEMPERATURE,
+        max_output_tokens=getattr(models, 'classifier_max_output_tokens', None)
     )
     
     obj = safe_yaml_load(txt)
@@ -1318,7 +1912,6 @@ Analyze the question and assign appropriate curriculum tags."""
                     raise ValueError(f"{prefix} schema {schema_id} classified with Biology tag: {primary_tag}. "
                                    f"Use a B schema instead.")
     
-    obj["_raw_text"] = txt
     return obj
 
 
@@ -1336,7 +1929,7 @@ def tag_labeler_call(llm: LLMClient, prompts: Prompts, models: ModelsConfig, que
     if subject == "mathematics" and hasattr(prompts, 'tag_labeler_math1') and prompts.tag_labeler_math1:
         # Use Math1 Tag_Labeler prompt
         user = f"""implemented_question (YAML):
-{yaml.safe_dump(question_obj, sort_keys=False)}
+{prompt_yaml(question_obj, sort_keys=False)}
 
 Assign ESAT Mathematics 1 curriculum tags (primary_tag: 1-7, secondary_tags: 0-2).
 Return raw YAML only."""
@@ -1346,7 +1939,8 @@ Return raw YAML only."""
             model=model,
             system_prompt=prompts.tag_labeler_math1,
             user_prompt=user,
-            temperature=0.3
+            temperature=JUDGE_TEMPERATURE,
+            max_output_tokens=getattr(models, 'classifier_max_output_tokens', None)
         )
         
         obj = safe_yaml_load(txt)
@@ -1358,7 +1952,6 @@ Return raw YAML only."""
         if primary_tag and not primary_tag in ["1", "2", "3", "4", "5", "6", "7"]:
             raise ValueError(f"Tag Labeler assigned invalid Math1 primary_tag: {primary_tag}. Must be 1-7.")
         
-        obj["_raw_text"] = txt
         return obj
     else:
         # Fallback to classifier_call for other subjects
@@ -1393,9 +1986,9 @@ def implementer_regen_call(llm: LLMClient, prompts: Prompts, models: ModelsConfi
         if os.path.exists(regen_header_path):
             regen_header = read_text(regen_header_path)
             # Replace placeholder with actual fail report
-            fail_yaml = yaml.safe_dump(verifier_report, sort_keys=False)
+            fail_yaml = prompt_yaml(verifier_report, sort_keys=False)
             if style_report:
-                fail_yaml += "\n\nstyle_report:\n" + yaml.safe_dump(style_report, sort_keys=False)
+                fail_yaml += "\n\nstyle_report:\n" + prompt_yaml(style_report, sort_keys=False)
             regen_header = regen_header.replace("<FAIL_YAML>", fail_yaml)
     
     subject_prompts = get_subject_prompts(prompts, schema_id)
@@ -1404,14 +1997,14 @@ def implementer_regen_call(llm: LLMClient, prompts: Prompts, models: ModelsConfi
     user += (
         retry_prompt.strip()
         + "\n\ndesigner_plan_yaml (YAML):\n"
-        + yaml.safe_dump(idea_plan, sort_keys=False)
+        + prompt_yaml(idea_plan, sort_keys=False)
         + "\n\nprevious_implemented_yaml (YAML):\n"
-        + yaml.safe_dump(previous_attempt, sort_keys=False)
+        + prompt_yaml(previous_attempt, sort_keys=False)
         + "\n\nfail_report_yaml (YAML):\n"
-        + yaml.safe_dump(verifier_report, sort_keys=False)
+        + prompt_yaml(verifier_report, sort_keys=False)
     )
     if style_report:
-        user += "\n\nstyle_report (YAML):\n" + yaml.safe_dump(style_report, sort_keys=False)
+        user += "\n\nstyle_report (YAML):\n" + prompt_yaml(style_report, sort_keys=False)
 
     txt = llm.generate(model=models.implementer, system_prompt=subject_prompts['implementer'], user_prompt=user, temperature=0.6)
     try:
@@ -1455,7 +2048,6 @@ def implementer_regen_call(llm: LLMClient, prompts: Prompts, models: ModelsConfi
             f"Raw output:\n{txt[:500]}..."
         )
     
-    obj["_raw_text"] = txt
     return obj
 
 
@@ -1489,9 +2081,7 @@ def validate_question_katex(question_obj: Dict[str, Any], schema_id: str) -> Tup
         - field: field name (e.g., "question.stem", "solution.reasoning")
         - errors: list of error strings
     """
-    try:
-        from katex_validator import validate_katex_formatting
-    except ImportError:
+    if validate_katex_formatting is None:
         # KaTeX validator not available, skip validation
         return True, []
     
@@ -1597,7 +2187,7 @@ def fix_katex_issues(llm: LLMClient, prompts: Prompts, models: ModelsConfig,
     # Build user prompt
     user_prompt = (
         "Original question package (YAML):\n"
-        + yaml.safe_dump(question_obj, sort_keys=False)
+        + prompt_yaml(question_obj, sort_keys=False)
         + "\n\n"
         + error_report
         + "\n\n"
@@ -1632,11 +2222,13 @@ def fix_katex_issues(llm: LLMClient, prompts: Prompts, models: ModelsConfig,
     if "solution" not in fixed_obj:
         raise ValueError(f"KaTeX fixer output missing 'solution' field")
     
-    fixed_obj["_raw_text"] = txt
     fixed_obj["_katex_fix_attempt"] = attempt
     
     return fixed_obj
 
+# Option keys a question package may use, in display order
+OPTION_LETTERS = tuple("ABCDEFGH")
+
 def normalize_options(question_obj: Dict[str, Any]) -> Dict[str, Any]:
     """
     Ensures options dict only contains non-empty A-H keys.
@@ -1648,7 +2240,7 @@ def normalize_options(question_obj: Dict[str, Any]) -> Dict[str, Any]:
     cleaned = {}
     for k, v in opts.items():
         kk = str(k).strip()
-        if kk in list("ABCDEFGH") and v is not None and str(v).strip() != "":
+        if kk in OPTION_LETTERS and v is not None and str(v).strip() != "":
             cleaned[kk] = v
     q["options"] = cleaned
     question_obj["question"] = q
@@ -1675,7 +2267,7 @@ def build_bank_item(idea_plan: Dict[str, Any], question_obj: Dict[str, Any], ver
             "style_judge": models.style_judge,
         },
         "attempts": attempts,
-        "created_at": datetime.datetime.now().isoformat(),
+        "created_at": now_iso(),
     }
     if token_usage:
         item["token_usage"] = token_usage
@@ -1683,81 +2275,55 @@ def build_bank_item(idea_plan: Dict[str, Any], question_obj: Dict[str, Any], ver
         item["tags"] = tags
     return item
 
+def _record_outcome(stats: Dict[str, Any], schema_id: str, outcome: str) -> None:
+    """Count an item outcome ("accepted" or "rejected") in the run totals and per schema."""
+    stats[outcome] += 1
+    stats["by_schema"][schema_id][outcome] += 1
+
+def _backup_rejected(rejected_item: Dict[str, Any], base_dir: str) -> None:
+    """Back up a rejected item if backup_manager is available (non-fatal)."""
+    if backup_question_from_pipeline is None:
+        return
+    try:
+        backup_question_from_pipeline(rejected_item, base_dir, status="rejected")
+    except Exception:
+        pass
+
 def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig, 
              callbacks: Optional[Dict[str, Callable]] = None,
              forced_schema_id: Optional[str] = None,
-             curriculum_parser=None) -> Dict[str, Any]:
+             curriculum_parser=None,
+             forced_difficulty: Optional[str] = None) -> Dict[str, Any]:
+    writer = JsonlWriter()
+    try:
+        return _run_once(base_dir, cfg, models, writer, callbacks=callbacks,
+                         forced_schema_id=forced_schema_id, curriculum_parser=curriculum_parser,
+                         forced_difficulty=forced_difficulty)
+    finally:
+        writer.close()
+
+
+def _run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig, writer: JsonlWriter,
+              callbacks: Optional[Dict[str, Callable]] = None,
+              forced_schema_id: Optional[str] = None,
+              curriculum_parser=None,
+              forced_difficulty: Optional[str] = None) -> Dict[str, Any]:
     if callbacks is None:
         callbacks = {}
-    if cfg.seed is not None:
-        random.seed(cfg.seed)
+    # Own RNG per item: run_many runs items on threads, so reseeding the module RNG
+    # would let them disturb each other's draws
+    rng = random.Random(cfg.seed)
 
     api_key = os.environ.get("GEMINI_API_KEY", "").strip()
     if not api_key:
         raise SystemExit("Missing GEMINI_API_KEY environment variable.")
 
-    prompts = load_prompts(base_dir)
-    
-    # Helper function to extract markdown from code blocks
-    def extract_markdown_from_code_blocks(text: str) -> str:
-        """Extract markdown content from markdown code blocks."""
-        pattern = r'```markdown\s*\n(.*?)(?:\n---\s*\n)?```'
-        matches = re.findall(pattern, text, re.DOTALL)
-        if matches:
-            cleaned_matches = [m.strip() for m in matches if m.strip()]
-            if cleaned_matches:
-                extracted = '\n\n'.join(cleaned_matches)
-                if extracted.strip() and '## **' in extracted:
-                    return extracted
-        return text
-    
-    # Try to find schema files - check multiple locations
-    schemas_path = None
-    schemas_md = None
-    
-    # Try multiple locations for ESAT schemas
-    base_dir_path = Path(base_dir)
-    scripts_dir = base_dir_path.parent
-    
-    # Location 1: Local schemas directory (preferred)
-    schemas_path = os.path.join(base_dir, "schemas", "Schemas_NSAA.md")
-    if os.path.exists(schemas_path):
-        schemas_md_raw = read_text(schemas_path)
-        schemas_md = extract_markdown_from_code_blocks(schemas_md_raw)
-        print(f"[run_once] Using schema file: {schemas_path}")
-    else:
-        # Location 2: Schemas_ESAT.md in local schemas directory
-        schemas_path = os.path.join(base_dir, "schemas", "Schemas_ESAT.md")
-        if os.path.exists(schemas_path):
-            schemas_md_raw = read_text(schemas_path)
-            schemas_md = extract_markdown_from_code_blocks(schemas_md_raw)
-            print(f"[run_once] Using schema file: {schemas_path}")
-        else:
-            # Location 3: Schemas.md in base directory
-            schemas_path = os.path.join(base_dir, "Schemas.md")
-            if os.path.exists(schemas_path):
-                schemas_md_raw = read_text(schemas_path)
-                schemas_md = extract_markdown_from_code_blocks(schemas_md_raw)
-                print(f"[run_once] Using schema file: {schemas_path}")
-            else:
-                # Location 4: Shared schemas directory (fallback)
-                shared_schemas_path = scripts_dir / "esat_question_generator" / "schemas" / "Schemas_NSAA.md"
-                if shared_schemas_path.exists():
-                    schemas_md_raw = read_text(str(shared_schemas_path))
-                    schemas_md = extract_markdown_from_code_blocks(schemas_md_raw)
-                    schemas_path = str(shared_schemas_path)
-                    print(f"[run_once] Using schema file: {schemas_path}")
-    
-    if not schemas_md:
-        raise FileNotFoundError(
-            f"Schema file not found. Tried:\n"
-            f"  - {os.path.join(base_dir, 'schemas', 'Schemas_NSAA.md')}\n"
-            f"  - {os.path.join(base_dir, 'schemas', 'Schemas_ESAT.md')}\n"
-            f"  - {os.path.join(base_dir, 'Schemas.md')}\n"
-            f"  - {scripts_dir / 'esat_question_generator' / 'schemas' / 'Schemas_NSAA.md'}"
-        )
+    prompts = load_prompts_cached(base_dir)
     
-    schemas = parse_schemas_from_markdown(schemas_md, allow_prefixes=cfg.allow_schema_prefixes)
+    schemas_path = find_schemas_path(base_dir)
+    print(f"[run_once] Using schema file: {schemas_path}")
+
+    schemas = load_schemas(schemas_path, allow_prefixes=cfg.allow_schema_prefixes)
     if schemas and forced_schema_id:
         sample_sids = [forced_schema_id] if forced_schema_id in schemas else list(schemas.keys())[:3]
         print(f"[run_once] Loaded {len(schemas)} schemas. Forced schema_id '{forced_schema_id}' {'found' if forced_schema_id in schemas else 'NOT FOUND'} in schemas. Sample IDs: {sample_sids}")
@@ -1781,9 +2347,18 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
     # Default: 2.0s for pro models, 1.0s for flash models
     default_min_delay = float(os.environ.get("API_MIN_DELAY", "2.0"))  # Increased default to 2.0s
     default_rate_limit_delay = float(os.environ.get("API_RATE_LIMIT_DELAY", "10.0"))  # Increased to 10s
-    llm = LLMClient(api_key=api_key, min_delay=default_min_delay, rate_limit_delay=default_rate_limit_delay)
-
-    run_id = now_stamp()
+    # LLM_CACHE=1 replays verifier/style responses to identical (exact-match) requests
+    # from earlier runs
+    llm_cache_path = None
+    if os.environ.get("LLM_CACHE", "0") == "1":
+        ensure_dir(os.path.join(base_dir, cfg.out_dir))
+        llm_cache_path = os.path.join(base_dir, cfg.out_dir, "_llm_cache.sqlite")
+    # CONTEXT_CACHE=1 sends system prompts through Gemini context caches
+    llm = LLMClient(api_key=api_key, min_delay=default_min_delay, rate_limit_delay=default_rate_limit_delay,
+                    cache_path=llm_cache_path, context_cache=os.environ.get("CONTEXT_CACHE", "0") == "1")
+
+    # Items started in the same second (run_many with MAX_WORKERS > 1) need their own directory
+    run_id = f"{now_stamp()}_{uuid.uuid4().hex[:6]}"
     run_dir = os.path.join(base_dir, cfg.out_dir, run_id)
     ensure_dir(run_dir)
 
@@ -1792,8 +2367,24 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
         "rejected": os.path.join(run_dir, "rejected.jsonl"),
         "logs": os.path.join(run_dir, "logs.jsonl"),
         "stats": os.path.join(run_dir, "stats.json"),
+        "raw": os.path.join(run_dir, "raw_responses.jsonl"),
     }
 
+    # Raw model output goes to its own file (one record per LLM response, labelled
+    # with the running stage) instead of being stored on the parsed objects
+    raw_stage = {"stage": "Designer", "detail": ""}
+    llm.on_response = lambda model, text: writer.write(paths["raw"], {
+        "run_id": run_id, **raw_stage, "model": model, "text": text,
+    })
+    user_stage_start = callbacks.get("on_stage_start")
+
+    def on_stage_start(stage: str, detail: str) -> None:
+        raw_stage["stage"], raw_stage["detail"] = stage, detail
+        if user_stage_start:
+            user_stage_start(stage, detail)
+
+    callbacks = {**callbacks, "on_stage_start": on_stage_start}
+
     stats = {
         "run_id": run_id,
         "accepted": 0,
@@ -1801,16 +2392,18 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
         "by_schema": {},
         "failures": {},
     }
+    # Written once when run_once finishes, whichever way the run ends
+    writer.write_on_close(paths["stats"], stats)
 
     # Generate one item per run_once; you can wrap to generate N items.
     # Use forced_schema_id if provided (for systematic generation), otherwise choose randomly
     if forced_schema_id and forced_schema_id in schemas:
         schema_id = forced_schema_id
     else:
-        schema_id = choose_schema(schemas, cfg)
+        schema_id = choose_schema(schemas, cfg, rng)
     schema_block = schemas[schema_id]["block"]
     exemplar_ids = schemas[schema_id].get("exemplar_ids", [])
-    difficulty = choose_difficulty(cfg)
+    difficulty = forced_difficulty or choose_difficulty(cfg, rng)
 
     if callbacks and "on_schema_selected" in callbacks:
         callbacks["on_schema_selected"](schema_id, difficulty)
@@ -1833,7 +2426,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
             if variation_mode not in ['base', 'sibling', 'far']:
                 variation_mode = 'base'
             
-            idea_plan = designer_call(llm, prompts, models, schema_block, schema_id, difficulty, exemplar_ids, variation_mode=variation_mode)
+            idea_plan = designer_call(llm, prompts, models, schema_block, schema_id, difficulty, exemplar_ids, variation_mode=variation_mode, rng=rng)
             if callbacks and "on_stage_complete" in callbacks:
                 callbacks["on_stage_complete"]("Designer", idea_plan)
             break
@@ -1855,7 +2448,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                 "error": designer_err,
                 "is_yaml_error": is_yaml_error,
             }
-            dump_jsonl(paths["logs"], log_entry)
+            writer.write(paths["logs"], log_entry)
             
             # Print helpful error message
             if is_yaml_error:
@@ -1874,7 +2467,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
             designer_err = str(e)
             if callbacks and "on_stage_error" in callbacks:
                 callbacks["on_stage_error"]("Designer", str(e))
-            dump_jsonl(paths["logs"], {
+            writer.write(paths["logs"], {
                 "stage": "designer",
                 "schema_id": schema_id,
                 "difficulty": difficulty,
@@ -1886,26 +2479,19 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
             if d_try < cfg.max_designer_retries:
                 print(f"   → Retrying...")
     if idea_plan is None:
-        stats["rejected"] += 1
-        stats["by_schema"][schema_id]["rejected"] += 1
+        _record_outcome(stats, schema_id, "rejected")
         rejected_item = {
             "schema_id": schema_id,
             "difficulty": difficulty,
             "stage": "designer",
             "error": designer_err,
-            "created_at": datetime.datetime.now().isoformat(),
+            "created_at": now_iso(),
             "run_id": run_id,
         }
-        dump_jsonl(paths["rejected"], rejected_item)
+        writer.write(paths["rejected"], rejected_item)
         
         # Backup rejected question
-        try:
-            from backup_manager import backup_question_from_pipeline
-            backup_question_from_pipeline(rejected_item, base_dir, status="rejected")
-        except (ImportError, Exception):
-            pass  # Non-fatal
-        with open(paths["stats"], "w", encoding="utf-8") as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+        _backup_rejected(rejected_item, base_dir)
         return {"run_dir": run_dir, "status": "designer_failed"}
 
     # Implementer + Retry controller
@@ -1918,7 +2504,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
             if attempt == 0:
                 if callbacks and "on_stage_start" in callbacks:
                     callbacks["on_stage_start"]("Implementer", f"Implementing question (Attempt {attempt + 1})")
-                q_pkg = implementer_call(llm, prompts, models, idea_plan, exemplar_ids=exemplar_ids)
+                q_pkg = implementer_call(llm, prompts, models, idea_plan, exemplar_ids=exemplar_ids, rng=rng)
                 if callbacks and "on_stage_complete" in callbacks:
                     callbacks["on_stage_complete"]("Implementer", q_pkg)
             else:
@@ -1937,12 +2523,27 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
 
             if callbacks and "on_stage_start" in callbacks:
                 callbacks["on_stage_start"]("Verifier", "Verifying question correctness")
-            verifier_report = verifier_call(llm, prompts, models, q_pkg, schema_id, designer_plan=idea_plan, exemplar_ids=exemplar_ids)
+            fused_style_report = None
+            style_future = None
+            if cfg.fuse_assessment:
+                verifier_report, fused_style_report = assess_call(llm, prompts, models, q_pkg, schema_id, designer_plan=idea_plan, exemplar_ids=exemplar_ids, rng=rng)
+            else:
+                if cfg.parallel_assessment:
+                    # The style checker doesn't get the verifier report in this mode;
+                    # its result is dropped if the verifier fails. It gets its own RNG so
+                    # the two threads don't interleave draws from rng
+                    style_future = _ASSESSMENT_POOL.submit(style_call, llm, prompts, models, q_pkg, schema_id, None, idea_plan, exemplar_ids, random.Random(rng.random()))
+                try:
+                    verifier_report = verifier_call(llm, prompts, models, q_pkg, schema_id, designer_plan=idea_plan, exemplar_ids=exemplar_ids, rng=rng)
+                except BaseException:
+                    if style_future is not None:
+                        style_future.exception()
+                    raise
             v_verdict = extract_verdict(verifier_report)
             if callbacks and "on_stage_complete" in callbacks:
                 callbacks["on_stage_complete"]("Verifier", verifier_report)
 
-            dump_jsonl(paths["logs"], {
+            writer.write(paths["logs"], {
                 "stage": "verifier",
                 "schema_id": schema_id,
                 "difficulty": difficulty,
@@ -1952,6 +2553,8 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
             })
 
             if v_verdict != "PASS":
+                if style_future is not None:
+                    style_future.exception()  # wait for it, the report isn't used
                 severity = extract_severity(verifier_report)
                 stats["failures"].setdefault(str(verifier_report.get("failure_type", "unknown")), 0)
                 stats["failures"][str(verifier_report.get("failure_type", "unknown"))] += 1
@@ -1971,20 +2574,13 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                         "verifier_report": verifier_report,
                         "idea_plan": idea_plan,
                         "question_package": q_pkg,
-                        "created_at": datetime.datetime.now().isoformat(),
+                        "created_at": now_iso(),
                         "run_id": run_id,
                     }
-                    dump_jsonl(paths["rejected"], rejected_item)
+                    writer.write(paths["rejected"], rejected_item)
                     # Backup rejected question
-                    try:
-                        from backup_manager import backup_question_from_pipeline
-                        backup_question_from_pipeline(rejected_item, base_dir, status="rejected")
-                    except (ImportError, Exception):
-                        pass
-                    stats["rejected"] += 1
-                    stats["by_schema"][schema_id]["rejected"] += 1
-                    with open(paths["stats"], "w", encoding="utf-8") as f:
-                        json.dump(stats, f, ensure_ascii=False, indent=2)
+                    _backup_rejected(rejected_item, base_dir)
+                    _record_outcome(stats, schema_id, "rejected")
                     return {"run_dir": run_dir, "status": "rejected_structural_verifier"}
 
                 # fixable -> retry if attempts remain
@@ -2000,31 +2596,29 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                     "verifier_report": verifier_report,
                     "idea_plan": idea_plan,
                     "question_package": q_pkg,
-                    "created_at": datetime.datetime.now().isoformat(),
+                    "created_at": now_iso(),
                     "run_id": run_id,
                 }
-                dump_jsonl(paths["rejected"], rejected_item)
+                writer.write(paths["rejected"], rejected_item)
                 # Backup rejected question
-                try:
-                    from backup_manager import backup_question_from_pipeline
-                    backup_question_from_pipeline(rejected_item, base_dir, status="rejected")
-                except (ImportError, Exception):
-                    pass
-                stats["rejected"] += 1
-                stats["by_schema"][schema_id]["rejected"] += 1
-                with open(paths["stats"], "w", encoding="utf-8") as f:
-                    json.dump(stats, f, ensure_ascii=False, indent=2)
+                _backup_rejected(rejected_item, base_dir)
+                _record_outcome(stats, schema_id, "rejected")
                 return {"run_dir": run_dir, "status": "rejected_verifier"}
 
             # Style Judge
             if callbacks and "on_stage_start" in callbacks:
                 callbacks["on_stage_start"]("Style Judge", "Checking exam authenticity")
-            style_report = style_call(llm, prompts, models, q_pkg, schema_id, verifier_obj=verifier_report, designer_plan=idea_plan, exemplar_ids=exemplar_ids)
+            if fused_style_report is not None:
+                style_report = fused_style_report
+            elif style_future is not None:
+                style_report = style_future.result()
+            else:
+                style_report = style_call(llm, prompts, models, q_pkg, schema_id, verifier_obj=verifier_report, designer_plan=idea_plan, exemplar_ids=exemplar_ids, rng=rng)
             s_verdict = extract_verdict(style_report)
             if callbacks and "on_stage_complete" in callbacks:
                 callbacks["on_stage_complete"]("Style Judge", style_report)
 
-            dump_jsonl(paths["logs"], {
+            writer.write(paths["logs"], {
                 "stage": "style_checker",
                 "schema_id": schema_id,
                 "difficulty": difficulty,
@@ -2051,20 +2645,13 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                         "verifier_report": verifier_report,
                         "idea_plan": idea_plan,
                         "question_package": q_pkg,
-                        "created_at": datetime.datetime.now().isoformat(),
+                        "created_at": now_iso(),
                         "run_id": run_id,
                     }
-                    dump_jsonl(paths["rejected"], rejected_item)
+                    writer.write(paths["rejected"], rejected_item)
                     # Backup rejected question
-                    try:
-                        from backup_manager import backup_question_from_pipeline
-                        backup_question_from_pipeline(rejected_item, base_dir, status="rejected")
-                    except (ImportError, Exception):
-                        pass
-                    stats["rejected"] += 1
-                    stats["by_schema"][schema_id]["rejected"] += 1
-                    with open(paths["stats"], "w", encoding="utf-8") as f:
-                        json.dump(stats, f, ensure_ascii=False, indent=2)
+                    _backup_rejected(rejected_item, base_dir)
+                    _record_outcome(stats, schema_id, "rejected")
                     return {"run_dir": run_dir, "status": "rejected_structural_style"}
 
                 if attempt < cfg.max_implementer_retries and is_fixable(severity):
@@ -2079,20 +2666,13 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                     "verifier_report": verifier_report,
                     "idea_plan": idea_plan,
                     "question_package": q_pkg,
-                    "created_at": datetime.datetime.now().isoformat(),
+                    "created_at": now_iso(),
                     "run_id": run_id,
                 }
-                dump_jsonl(paths["rejected"], rejected_item)
+                writer.write(paths["rejected"], rejected_item)
                 # Backup rejected question
-                try:
-                    from backup_manager import backup_question_from_pipeline
-                    backup_question_from_pipeline(rejected_item, base_dir, status="rejected")
-                except (ImportError, Exception):
-                    pass
-                stats["rejected"] += 1
-                stats["by_schema"][schema_id]["rejected"] += 1
-                with open(paths["stats"], "w", encoding="utf-8") as f:
-                    json.dump(stats, f, ensure_ascii=False, indent=2)
+                _backup_rejected(rejected_item, base_dir)
+                _record_outcome(stats, schema_id, "rejected")
                 return {"run_dir": run_dir, "status": "rejected_style"}
 
             # PASS both gates -> KaTeX Validation (with retry logic)
@@ -2145,7 +2725,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                         except Exception as e:
                             # Fix attempt failed, log and continue to next attempt or reject
                             error_str = str(e)
-                            dump_jsonl(paths["logs"], {
+                            writer.write(paths["logs"], {
                                 "stage": "katex_fixer",
                                 "schema_id": schema_id,
                                 "difficulty": difficulty,
@@ -2171,20 +2751,13 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                             "style_report": style_report,
                             "idea_plan": idea_plan,
                             "question_package": q_pkg,
-                            "created_at": datetime.datetime.now().isoformat(),
+                            "created_at": now_iso(),
                             "run_id": run_id,
                         }
-                        dump_jsonl(paths["rejected"], rejected_item)
+                        writer.write(paths["rejected"], rejected_item)
                         # Backup rejected question
-                        try:
-                            from backup_manager import backup_question_from_pipeline
-                            backup_question_from_pipeline(rejected_item, base_dir, status="rejected")
-                        except (ImportError, Exception):
-                            pass
-                        stats["rejected"] += 1
-                        stats["by_schema"][schema_id]["rejected"] += 1
-                        with open(paths["stats"], "w", encoding="utf-8") as f:
-                            json.dump(stats, f, ensure_ascii=False, indent=2)
+                        _backup_rejected(rejected_item, base_dir)
+                        _record_outcome(stats, schema_id, "rejected")
                         return {"run_dir": run_dir, "status": "rejected_katex_validation"}
             
             if not katex_validation_passed:
@@ -2209,40 +2782,25 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
             # Add run_id to item
             item["_run_id"] = run_id
 
-            # Validate and fix KaTeX formatting
-            try:
-                from katex_validator import validate_question_package, fix_katex_formatting
-                # Get subject for validation
-                validation_subject = get_subject_from_schema(schema_id)
-                validation_subject = validation_subject if validation_subject in ["physics", "chemistry", "biology"] else None
-                is_valid, errors = validate_question_package(q_pkg, subject=validation_subject)
-                if not is_valid:
-                    print(f"⚠ KaTeX validation warnings: {errors}")
-                    # Fix formatting issues
-                    q_pkg = fix_katex_formatting(q_pkg)
-                    # Rebuild item with fixed question package
-                    item = build_bank_item(
-                        idea_plan=idea_plan,
-                        question_obj=q_pkg,
-                        verifier_obj=verifier_report,
-                        style_obj=style_report,
-                        schema_id=schema_id,
-                        difficulty=difficulty,
-                        models=models,
-                        attempts=attempt + 1,
-                        token_usage=token_usage,
-                    )
-            except ImportError:
-                # katex_validator not available, skip validation
-                pass
-            except Exception as e:
-                print(f"⚠ KaTeX validation error (non-fatal): {e}")
+            # Validate and fix KaTeX formatting (skipped if katex_validator isn't available)
+            if validate_question_package is not None:
+                try:
+                    # Get subject for validation
+                    validation_subject = get_subject_from_schema(schema_id)
+                    validation_subject = validation_subject if validation_subject in ["physics", "chemistry", "biology"] else None
+                    is_valid, errors = validate_question_package(q_pkg, subject=validation_subject)
+                    if not is_valid:
+                        print(f"⚠ KaTeX validation warnings: {errors}")
+                        # Fix formatting issues; only the question package changes,
+                        # so patch it into the item rather than rebuilding the item
+                        q_pkg = fix_katex_formatting(q_pkg)
+                        item["question_package"] = normalize_options(q_pkg)
+                except Exception as e:
+                    print(f"⚠ KaTeX validation error (non-fatal): {e}")
 
-            dump_jsonl(paths["accepted"], item)
-            stats["accepted"] += 1
-            stats["by_schema"][schema_id]["accepted"] += 1
-            with open(paths["stats"], "w", encoding="utf-8") as f:
-                json.dump(stats, f, ensure_ascii=False, indent=2)
+            writer.write(paths["accepted"], item)
+            writer.flush()  # Don't hold an accepted item in the buffer while tagging/syncing
+            _record_outcome(stats, schema_id, "accepted")
             
             # Tag labeling is now handled by classifier_station() after question acceptance
             # Run classifier AFTER acceptance (non-blocking, like TMUA)
@@ -2287,7 +2845,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                         "primary_tag": primary_tag,
                         "secondary_tags": secondary_tags,
                         "confidence": confidence,
-                        "labeled_at": datetime.datetime.now().isoformat(),
+                        "labeled_at": now_iso(),
                         "labeled_by": "classifier_station",
                         "reasoning": tag_result.get("reasoning", "")
                     }
@@ -2299,7 +2857,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                     # Update item with tags
                     item["tags"] = tags
                     
-                    dump_jsonl(paths["logs"], {
+                    writer.write(paths["logs"], {
                         "stage": "classifier_station",
                         "schema_id": schema_id,
                         "difficulty": difficulty,
@@ -2313,7 +2871,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                     # Classifier failures should not block question generation
                     error_msg = str(e)
                     print(f"⚠ Classifier failed (non-fatal): {error_msg[:200]}...")
-                    dump_jsonl(paths["logs"], {
+                    writer.write(paths["logs"], {
                         "stage": "classifier_station",
                         "schema_id": schema_id,
                         "difficulty": difficulty,
@@ -2324,30 +2882,28 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                         callbacks["on_stage_error"]("Classifier Station", error_msg)
             
             # Backup question (all questions, accepted and rejected)
-            try:
-                from backup_manager import backup_question_from_pipeline
-                backup_path = backup_question_from_pipeline(item, base_dir, status="pending_review")
-                if backup_path:
-                    try:
-                        print(f"✓ Backed up question to: {backup_path}")
-                    except UnicodeEncodeError:
-                        print(f"[OK] Backed up question to: {backup_path}")
-            except ImportError:
+            if backup_question_from_pipeline is None:
                 print("⚠ Backup manager not available, skipping backup")
-            except Exception as e:
-                print(f"⚠ Backup error (non-fatal): {e}")
+            else:
+                try:
+                    backup_path = backup_question_from_pipeline(item, base_dir, status="pending_review")
+                    if backup_path:
+                        try:
+                            print(f"✓ Backed up question to: {backup_path}")
+                        except UnicodeEncodeError:
+                            print(f"[OK] Backed up question to: {backup_path}")
+                except Exception as e:
+                    print(f"⚠ Backup error (non-fatal): {e}")
             
             # Sync to database (silently - no console output)
             # Only questions that pass verifier + style judge will be saved
-            try:
-                from db_sync import sync_question_from_pipeline
-                db_id = sync_question_from_pipeline(item, base_dir, status="approved")
-                if db_id:
-                    item["_db_id"] = db_id
-            except ImportError:
-                pass  # Silent fail
-            except Exception:
-                pass  # Silent fail - errors logged in db_sync.py
+            if sync_question_from_pipeline is not None:
+                try:
+                    db_id = sync_question_from_pipeline(item, base_dir, status="approved")
+                    if db_id:
+                        item["_db_id"] = db_id
+                except Exception:
+                    pass  # Silent fail - errors logged in db_sync.py
             
             # HTML generation disabled - questions are saved to database and shown in UI
             # No need to generate HTML files or open previews
@@ -2378,7 +2934,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                 if attempt < cfg.max_implementer_retries:
                     print(f"  → Retrying... ({attempt + 1}/{cfg.max_implementer_retries})")
             
-            dump_jsonl(paths["logs"], {
+            writer.write(paths["logs"], {
                 "stage": "pipeline_exception",
                 "schema_id": schema_id,
                 "difficulty": difficulty,
@@ -2398,7 +2954,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
             if "question" in error_msg.lower() or "solution" in error_msg.lower():
                 print("  → Missing required fields in Implementer output")
             
-            dump_jsonl(paths["logs"], {
+            writer.write(paths["logs"], {
                 "stage": "pipeline_exception",
                 "schema_id": schema_id,
                 "difficulty": difficulty,
@@ -2410,8 +2966,7 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
             if attempt < cfg.max_implementer_retries:
                 print(f"  → Retrying... ({attempt + 1}/{cfg.max_implementer_retries})")
                 continue
-            stats["rejected"] += 1
-            stats["by_schema"][schema_id]["rejected"] += 1
+            _record_outcome(stats, schema_id, "rejected")
             rejected_item = {
                 "schema_id": schema_id,
                 "difficulty": difficulty,
@@ -2419,54 +2974,85 @@ def run_once(base_dir: str, cfg: RunConfig, models: ModelsConfig,
                 "stage": "exception",
                 "error": str(e),
                 "idea_plan": idea_plan,
-                "created_at": datetime.datetime.now().isoformat(),
+                "created_at": now_iso(),
                 "run_id": run_id,
             }
-            dump_jsonl(paths["rejected"], rejected_item)
+            writer.write(paths["rejected"], rejected_item)
             # Backup rejected question
-            try:
-                from backup_manager import backup_question_from_pipeline
-                backup_question_from_pipeline(rejected_item, base_dir, status="rejected")
-            except (ImportError, Exception):
-                pass
-            with open(paths["stats"], "w", encoding="utf-8") as f:
-                json.dump(stats, f, ensure_ascii=False, indent=2)
+            _backup_rejected(rejected_item, base_dir)
             return {"run_dir": run_dir, "status": "rejected_exception"}
 
     # Should never reach here
     return {"run_dir": run_dir, "status": "unknown"}
 
 
-def run_many(n: int, base_dir: str, cfg: RunConfig, models: ModelsConfig) -> None:
+def _report_run_result(i: int, n: int, res: Optional[Dict[str, Any]], error: Optional[BaseException] = None) -> None:
+    """Print the outcome of item i of n from run_many."""
+    if error is not None:
+        try:
+            print(f"✗ [{i}/{n}] EXCEPTION: {str(error)[:200]}")
+        except UnicodeEncodeError:
+            print(f"[ERROR] [{i}/{n}] EXCEPTION: {str(error)[:200]}")
+        import traceback
+        traceback.print_exception(type(error), error, error.__traceback__)
+        return
+    
+    status = res.get("status", "unknown")
+    if status == "accepted":
+        try:
+            print(f"✓ [{i}/{n}] SUCCESS - Question ID: {res.get('item_id', 'N/A')}")
+        except UnicodeEncodeError:
+            print(f"[OK] [{i}/{n}] SUCCESS - Question ID: {res.get('item_id', 'N/A')}")
+    else:
+        try:
+            print(f"✗ [{i}/{n}] FAILED - Status: {status}")
+        except UnicodeEncodeError:
+            print(f"[FAIL] [{i}/{n}] FAILED - Status: {status}")
+        if "run_dir" in res:
+            print(f"  Check logs: {res['run_dir']}")
+
+
+def run_many(n: int, base_dir: str, cfg: RunConfig, models: ModelsConfig, max_workers: int = 1) -> None:
     """
     Runs n independent items (each creates its own run directory).
+    
+    With max_workers > 1, up to that many items run concurrently on threads - each
+    pipeline spends nearly all its time waiting on Gemini API calls, so their
+    network latency overlaps.
+    
+    Every item's schema and difficulty are drawn up front (plan_items).
     """
-    for i in range(n):
-        print(f"\n{'='*60}")
-        print(f"Generating question {i+1}/{n}...")
-        print(f"{'='*60}")
-        try:
-            res = run_once(base_dir=base_dir, cfg=cfg, models=models)
-            status = res.get("status", "unknown")
-            if status == "accepted":
-                try:
-                    print(f"✓ [{i+1}/{n}] SUCCESS - Question ID: {res.get('item_id', 'N/A')}")
-                except UnicodeEncodeError:
-                    print(f"[OK] [{i+1}/{n}] SUCCESS - Question ID: {res.get('item_id', 'N/A')}")
-            else:
-                try:
-                    print(f"✗ [{i+1}/{n}] FAILED - Status: {status}")
-                except UnicodeEncodeError:
-                    print(f"[FAIL] [{i+1}/{n}] FAILED - Status: {status}")
-                if "run_dir" in res:
-                    print(f"  Check logs: {res['run_dir']}")
-        except Exception as e:
+    schemas = load_schemas(find_schemas_path(base_dir), allow_prefixes=cfg.allow_schema_prefixes)
+    plan = plan_items(schemas, cfg, n)
+    
+    if max_workers <= 1 or n <= 1:
+        for i, (schema_id, difficulty) in enumerate(plan):
+            print(f"\n{'='*60}")
+            print(f"Generating question {i+1}/{n}...")
+            print(f"{'='*60}")
             try:
-                print(f"✗ [{i+1}/{n}] EXCEPTION: {str(e)[:200]}")
-            except UnicodeEncodeError:
-                print(f"[ERROR] [{i+1}/{n}] EXCEPTION: {str(e)[:200]}")
-            import traceback
-            traceback.print_exc()
+                res = run_once(base_dir=base_dir, cfg=cfg, models=models,
+                               forced_schema_id=schema_id, forced_difficulty=difficulty)
+            except Exception as e:
+                _report_run_result(i + 1, n, None, e)
+            else:
+                _report_run_result(i + 1, n, res)
+        return
+    
+    from concurrent.futures import as_completed
+    
+    print(f"\n{'='*60}")
+    print(f"Generating {n} questions with {min(max_workers, n)} concurrent workers...")
+    print(f"{'='*60}")
+    with ThreadPoolExecutor(max_workers=min(max_workers, n)) as executor:
+        futures = {
+            executor.submit(run_once, base_dir=base_dir, cfg=cfg, models=models,
+                            forced_schema_id=schema_id, forced_difficulty=difficulty): i + 1
+            for i, (schema_id, difficulty) in enumerate(plan)
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            _report_run_result(futures[future], n, None if error else future.result(), error)
 
 
 def safe_load_dotenv(filepath: str) -> bool:
@@ -2475,13 +3061,14 @@ def safe_load_dotenv(filepath: str) -> bool:
         return False
     
     try:
-        # Read file and remove BOM if present
-        with open(filepath, 'r', encoding='utf-8-sig') as f:  # utf-8-sig automatically strips BOM
-            content = f.read()
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        raw.decode('utf-8')  # Not UTF-8 -> UnicodeDecodeError -> UTF-16 handling below
         
-        # Write back without BOM
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Rewrite without the BOM only if there is one
+        if raw.startswith(b"\xef\xbb\xbf"):
+            with open(filepath, 'wb') as f:
+                f.write(raw[3:])
         
         # Now load it
         load_dotenv(filepath, encoding="utf-8", override=True)
@@ -2521,40 +3108,33 @@ def main():
     # Check and display key environment variables
     gemini_key = os.environ.get("GEMINI_API_KEY", "").strip()
     n_items = os.environ.get("N_ITEMS", "1")
-    max_retries = os.environ.get("MAX_IMPLEMENTER_RETRIES", "2")
-    schema_prefixes = os.environ.get("SCHEMA_PREFIXES", "M,P")
+    max_workers = os.environ.get("MAX_WORKERS", "1")
+    cfg = _build_run_config_from_env()
     
     print(f"Configuration loaded from .env.local:")
     print(f"  GEMINI_API_KEY: {'***' + gemini_key[-4:] if len(gemini_key) > 4 else 'NOT SET'}")
     print(f"  N_ITEMS: {n_items}")
-    print(f"  MAX_IMPLEMENTER_RETRIES: {max_retries}")
-    print(f"  SCHEMA_PREFIXES: {schema_prefixes}")
+    print(f"  MAX_WORKERS: {max_workers}")
+    print(f"  MAX_IMPLEMENTER_RETRIES: {cfg.max_implementer_retries}")
+    print(f"  SCHEMA_PREFIXES: {','.join(cfg.allow_schema_prefixes)}")
+    print(f"  FUSE_ASSESSMENT: {int(cfg.fuse_assessment)}")
+    print(f"  PARALLEL_ASSESSMENT: {int(cfg.parallel_assessment)}")
+    print(f"  LLM_CACHE: {os.environ.get('LLM_CACHE', '0')}")
+    if _YAML_LOADER is yaml.SafeLoader:
+        print("  Note: PyYAML was built without libyaml, so model output is parsed with the slower pure-Python loader")
     print()
 
-    cfg = RunConfig(
-        max_implementer_retries=int(max_retries),
-        max_designer_retries=int(os.environ.get("MAX_DESIGNER_RETRIES", "2")),
-        seed=int(os.environ["SEED"]) if os.environ.get("SEED") else None,
-        difficulty_weights={
-            "Easy": float(os.environ.get("W_EASY", "0.3")),
-            "Medium": float(os.environ.get("W_MED", "0.5")),
-            "Hard": float(os.environ.get("W_HARD", "0.2")),
-        },
-        schema_weights=None,
-        out_dir=os.environ.get("OUT_DIR", "runs"),
-        allow_schema_prefixes=tuple(schema_prefixes.split(",")),
-    )
-
     models = get_default_models_config()
 
     n = int(n_items)
-    run_many(n=n, base_dir=base_dir, cfg=cfg, models=models)
+    run_many(n=n, base_dir=base_dir, cfg=cfg, models=models, max_workers=int(max_workers))
 
 
 # ---------- GUI Interface ----------
 
 class PipelineGUI:
     def __init__(self, root: tk.Tk, base_dir: str, cfg: RunConfig, models: ModelsConfig):
+        _import_tk()
         self.root = root
         self.base_dir = base_dir
         self.cfg = cfg
@@ -2676,22 +3256,24 @@ class PipelineGUI:
         output.delete(1.0, tk.END)
         output.config(state=tk.DISABLED)
     
+    def _set_text(self, widget, text: str):
+        """Replace the contents of a read-only text widget (one delete, one insert)"""
+        widget.config(state=tk.NORMAL)
+        if widget.compare("end-1c", "!=", "1.0"):  # skip the delete when already empty
+            widget.delete(1.0, tk.END)
+        if text:
+            widget.insert(1.0, text)
+        widget.config(state=tk.DISABLED)
+    
     def clear_all_results(self):
         """Clear all result tabs"""
-        self.result_text.config(state=tk.NORMAL)
-        self.result_text.delete(1.0, tk.END)
-        self.result_text.config(state=tk.DISABLED)
-        self.solution_text.config(state=tk.NORMAL)
-        self.solution_text.delete(1.0, tk.END)
-        self.solution_text.config(state=tk.DISABLED)
-        self.details_text.config(state=tk.NORMAL)
-        self.details_text.delete(1.0, tk.END)
-        self.details_text.config(state=tk.DISABLED)
+        for widget in (self.result_text, self.solution_text, self.details_text):
+            self._set_text(widget, "")
     
     def format_yaml(self, data: Any) -> str:
         """Format data as YAML string"""
         try:
-            return yaml.safe_dump(data, sort_keys=False, default_flow_style=False, allow_unicode=True)
+            return yaml_dump(data, sort_keys=False, default_flow_style=False, allow_unicode=True)
         except:
             return str(data)
     
@@ -2748,12 +3330,9 @@ class PipelineGUI:
                 ))
                 # Show error in result area
                 error_result = json.dumps(result, indent=2)
-                def update():
-                    self.result_text.config(state=tk.NORMAL)
-                    self.result_text.delete(1.0, tk.END)
-                    self.result_text.insert(1.0, f"Generation failed with status: {status}\n\nResult: {error_result}")
-                    self.result_text.config(state=tk.DISABLED)
-                self.root.after(0, update)
+                self.root.after(0, lambda: self._set_text(
+                    self.result_text, f"Generation failed with status: {status}\n\nResult: {error_result}"
+                ))
         except Exception as e:
             import traceback
             error_msg = f"Exception: {str(e)}\n\n{traceback.format_exc()}"
@@ -2769,10 +3348,7 @@ class PipelineGUI:
 
             self.root.after(0, lambda: (
                 self.status_label.config(text=f"Error: {error_short}...", foreground="red"),
-                self.result_text.config(state=tk.NORMAL),
-                self.result_text.delete(1.0, tk.END),
-                self.result_text.insert(1.0, error_msg),
-                self.result_text.config(state=tk.DISABLED)
+                self._set_text(self.result_text, error_msg)
             ))
         finally:
             def update():
@@ -2822,88 +3398,78 @@ class PipelineGUI:
     
     def on_success(self, item: Dict[str, Any]):
         """Callback when question is successfully generated"""
-        question = item.get("question_package", {}).get("question", {})
-        solution = item.get("question_package", {}).get("solution", {})
+        q_pkg = item.get("question_package") or {}
+        question = q_pkg.get("question") or {}
+        solution = q_pkg.get("solution") or {}
         stem = question.get("stem", "N/A")
-        options = question.get("options", {})
+        options = question.get("options") or {}
         correct = question.get("correct_option", "N/A")
-        distractor_map = item.get("question_package", {}).get("distractor_map", {})
+        distractor_map = q_pkg.get("distractor_map") or {}
         
         # Question tab content
-        question_text = f"QUESTION:\n{'='*60}\n\n{stem}\n\n"
-        question_text += "OPTIONS:\n" + "="*60 + "\n"
-        for opt, text in sorted(options.items()):
-            try:
+        question_parts = [f"QUESTION:\n{'='*60}\n\n{stem}\n\n", "OPTIONS:\n" + "="*60 + "\n"]
+        # Options are normalized to A-H keys, so walk the letters instead of sorting
+        for opt in OPTION_LETTERS:
+            if opt in options:
                 marker = " ✓ [CORRECT]" if opt == correct else ""
-            except UnicodeEncodeError:
-                marker = " [CORRECT]" if opt == correct else ""
-            question_text += f"\n{opt}: {text}{marker}"
-        question_text += f"\n\n{'='*60}\nCorrect Answer: {correct}\n"
+                question_parts.append(f"\n{opt}: {options[opt]}{marker}")
+        question_parts.append(f"\n\n{'='*60}\nCorrect Answer: {correct}\n")
+        question_text = "".join(question_parts)
         
         # Solution tab content
-        solution_text = "SOLUTION:\n" + "="*60 + "\n\n"
+        solution_parts = ["SOLUTION:\n" + "="*60 + "\n\n"]
         if solution.get("reasoning"):
-            solution_text += "REASONING:\n" + "-"*60 + "\n"
-            solution_text += solution.get("reasoning", "N/A") + "\n\n"
+            solution_parts.append("REASONING:\n" + "-"*60 + "\n")
+            solution_parts.append(solution.get("reasoning", "N/A") + "\n\n")
         if solution.get("key_insight"):
-            solution_text += "KEY INSIGHT:\n" + "-"*60 + "\n"
-            solution_text += solution.get("key_insight", "N/A") + "\n"
+            solution_parts.append("KEY INSIGHT:\n" + "-"*60 + "\n")
+            solution_parts.append(solution.get("key_insight", "N/A") + "\n")
+        solution_text = "".join(solution_parts)
         
         # Details tab content
-        details_text = f"Question ID: {item.get('id', 'N/A')}\n"
-        details_text += f"Schema: {item.get('schema_id', 'N/A')}\n"
-        details_text += f"Difficulty: {item.get('difficulty', 'N/A')}\n"
-        details_text += f"Attempts: {item.get('attempts', 'N/A')}\n"
-        details_text += f"Created: {item.get('created_at', 'N/A')}\n\n"
-        details_text += "="*60 + "\n\n"
-        details_text += "DISTRACTOR ANALYSIS:\n" + "-"*60 + "\n"
+        details_parts = [
+            f"Question ID: {item.get('id', 'N/A')}\n",
+            f"Schema: {item.get('schema_id', 'N/A')}\n",
+            f"Difficulty: {item.get('difficulty', 'N/A')}\n",
+            f"Attempts: {item.get('attempts', 'N/A')}\n",
+            f"Created: {item.get('created_at', 'N/A')}\n\n",
+            "="*60 + "\n\n",
+            "DISTRACTOR ANALYSIS:\n" + "-"*60 + "\n",
+        ]
         for opt, desc in sorted(distractor_map.items()):
             marker = " [CORRECT]" if opt == correct else ""
-            details_text += f"\n{opt}: {desc}{marker}\n"
-        details_text += "\n" + "="*60 + "\n\n"
-        details_text += "VERIFIER REPORT:\n" + "-"*60 + "\n"
+            details_parts.append(f"\n{opt}: {desc}{marker}\n")
+        details_parts.append("\n" + "="*60 + "\n\n")
+        details_parts.append("VERIFIER REPORT:\n" + "-"*60 + "\n")
         verifier = item.get("verifier_report", {})
-        details_text += f"Verdict: {verifier.get('verdict', 'N/A')}\n"
-        details_text += f"Confidence: {verifier.get('confidence', 'N/A')}\n"
+        details_parts.append(f"Verdict: {verifier.get('verdict', 'N/A')}\n")
+        details_parts.append(f"Confidence: {verifier.get('confidence', 'N/A')}\n")
         if verifier.get("notes"):
-            details_text += "\nNotes:\n"
+            details_parts.append("\nNotes:\n")
             for note in verifier.get("notes", []):
-                details_text += f"  • {note}\n"
-        details_text += "\n" + "="*60 + "\n\n"
-        details_text += "STYLE REPORT:\n" + "-"*60 + "\n"
+                details_parts.append(f"  • {note}\n")
+        details_parts.append("\n" + "="*60 + "\n\n")
+        details_parts.append("STYLE REPORT:\n" + "-"*60 + "\n")
         style = item.get("style_report", {})
-        details_text += f"Verdict: {style.get('verdict', 'N/A')}\n"
+        details_parts.append(f"Verdict: {style.get('verdict', 'N/A')}\n")
         if style.get("scores"):
-            details_text += "\nScores:\n"
+            details_parts.append("\nScores:\n")
             for key, val in style.get("scores", {}).items():
-                details_text += f"  {key}: {val}/10\n"
+                details_parts.append(f"  {key}: {val}/10\n")
         if style.get("summary"):
-            details_text += f"\nSummary: {style.get('summary')}\n"
+            details_parts.append(f"\nSummary: {style.get('summary')}\n")
+        details_text = "".join(details_parts)
         
         def update():
-            # Update question tab
-            self.result_text.config(state=tk.NORMAL)
-            self.result_text.delete(1.0, tk.END)
-            self.result_text.insert(1.0, question_text)
-            self.result_text.config(state=tk.DISABLED)
-            
-            # Update solution tab
-            self.solution_text.config(state=tk.NORMAL)
-            self.solution_text.delete(1.0, tk.END)
-            self.solution_text.insert(1.0, solution_text)
-            self.solution_text.config(state=tk.DISABLED)
-            
-            # Update details tab
-            self.details_text.config(state=tk.NORMAL)
-            self.details_text.delete(1.0, tk.END)
-            self.details_text.insert(1.0, details_text)
-            self.details_text.config(state=tk.DISABLED)
+            self._set_text(self.result_text, question_text)
+            self._set_text(self.solution_text, solution_text)
+            self._set_text(self.details_text, details_text)
         self.root.after(0, update)
 
 
 def run_gui():
     """Run the GUI interface"""
-    if not _TKINTER_AVAILABLE:
+    if not _import_tk():
         print("Tkinter not available. Falling back to command-line mode.")
         main()
         return
@@ -2914,17 +3480,8 @@ def run_gui():
     base_dir = os.path.dirname(os.path.abspath(__file__))
     
     # Configuration for math questions only
-    cfg = RunConfig(
-        max_implementer_retries=int(os.environ.get("MAX_IMPLEMENTER_RETRIES", "2")),
-        max_designer_retries=int(os.environ.get("MAX_DESIGNER_RETRIES", "2")),
+    cfg = _build_run_config_from_env(
         seed=None,
-        difficulty_weights={
-            "Easy": float(os.environ.get("W_EASY", "0.3")),
-            "Medium": float(os.environ.get("W_MED", "0.5")),
-            "Hard": float(os.environ.get("W_HARD", "0.2")),
-        },
-        schema_weights=None,
-        out_dir=os.environ.get("OUT_DIR", "runs"),
         allow_schema_prefixes=("M",),  # Math only for GUI
     )
     
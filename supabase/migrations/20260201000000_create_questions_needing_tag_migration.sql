@@ -0,0 +1,54 @@
+-- Migration: Find questions with raw (unprefixed) curriculum tags
+-- Description: Lets migrate_tags_to_prefixed.py stream only the questions it has to
+-- migrate, page by page (keyset pagination on id), instead of every row in
+-- ai_generated_questions.
+-- A tag needs migration when it is a non-empty code without a hyphen (e.g. "MM1"
+-- rather than "M2-MM1"), matching needs_migration() in the script.
+-- Partial indexes on the two halves of the filter mean only those rows are read.
+-- A GIN index on secondary_tags wouldn't help here: it answers "contains this
+-- element" but not "has an element without a hyphen".
+
+-- True if a JSONB tag array has a non-empty tag without a hyphen (e.g. "MM1").
+-- Kept as a function so the same expression can be used in an index predicate.
+CREATE OR REPLACE FUNCTION has_raw_curriculum_tag(tags jsonb)
+RETURNS boolean AS $$
+  SELECT jsonb_typeof(tags) = 'array'
+    AND EXISTS (
+      SELECT 1
+      FROM jsonb_array_elements_text(tags) AS tag_value
+      WHERE tag_value <> '' AND position('-' in tag_value) = 0
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Indexed on id so the keyset pagination (id > after_id ORDER BY id) can use them
+CREATE INDEX IF NOT EXISTS idx_ai_questions_raw_primary_tag
+  ON ai_generated_questions (id)
+  WHERE primary_tag <> '' AND position('-' in primary_tag) = 0;
+
+CREATE INDEX IF NOT EXISTS idx_ai_questions_raw_secondary_tags
+  ON ai_generated_questions (id)
+  WHERE has_raw_curriculum_tag(secondary_tags);
+
+-- after_id: return rows with id greater than this (NULL = from the start)
+-- page_size: maximum rows to return (NULL = no limit)
+CREATE OR REPLACE FUNCTION questions_needing_tag_migration(
+  after_id uuid DEFAULT NULL,
+  page_size integer DEFAULT NULL
+)
+RETURNS TABLE (id uuid, primary_tag text, secondary_tags jsonb) AS $$
+  SELECT q.id, q.primary_tag, q.secondary_tags
+  FROM ai_generated_questions q
+  WHERE (after_id IS NULL OR q.id > after_id)
+    AND (
+      (q.primary_tag <> '' AND position('-' in q.primary_tag) = 0)
+      OR has_raw_curriculum_tag(q.secondary_tags)
+    )
+  ORDER BY q.id
+  LIMIT page_size;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION has_raw_curriculum_tag(jsonb) IS
+  'True if a JSONB tag array contains a raw (unprefixed) curriculum code';
+
+COMMENT ON FUNCTION questions_needing_tag_migration(uuid, integer) IS
+  'Questions whose primary_tag or secondary_tags still contain raw (unprefixed) curriculum codes, paged by id';
@@ -0,0 +1,39 @@
+-- Migration: Apply many question tag updates in one call
+-- Description: Lets migrate_tags_to_prefixed.py and label_existing_questions.py write
+-- a whole batch of tags in a single request instead of one UPDATE per question.
+-- An upsert can't be used for this: the partial rows (id + tags) would fail the
+-- NOT NULL checks on the insert path before the conflict is detected.
+
+-- updates: JSONB array of objects like
+--   {"id": "<uuid>", "primary_tag": "M2-MM1", "secondary_tags": ["P-P1"]}
+--   {"generation_id": "M1-Easy-ab12", "primary_tag": "M2-MM1", "tags_confidence": 0.9}
+-- Each object is matched on whichever of "id" / "generation_id" it has ("id" wins
+-- if both are given). generation_id keys are resolved to ids first, so the UPDATE
+-- itself is a plain join on the primary key (an OR of the two keys would keep
+-- Postgres from using either index).
+-- Only the column keys present in an object are changed; values are converted to
+-- the column types with jsonb_populate_record.
+-- Returns the id and generation_id of the rows that were updated.
+CREATE OR REPLACE FUNCTION apply_question_tag_updates(updates jsonb)
+RETURNS TABLE (id uuid, generation_id text) AS $$
+  UPDATE ai_generated_questions q
+  SET
+    primary_tag = CASE WHEN t.value ? 'primary_tag' THEN (t.rec).primary_tag ELSE q.primary_tag END,
+    secondary_tags = CASE WHEN t.value ? 'secondary_tags' THEN (t.rec).secondary_tags ELSE q.secondary_tags END,
+    tags_confidence = CASE WHEN t.value ? 'tags_confidence' THEN (t.rec).tags_confidence ELSE q.tags_confidence END,
+    tags_labeled_at = CASE WHEN t.value ? 'tags_labeled_at' THEN (t.rec).tags_labeled_at ELSE q.tags_labeled_at END,
+    tags_labeled_by = CASE WHEN t.value ? 'tags_labeled_by' THEN (t.rec).tags_labeled_by ELSE q.tags_labeled_by END
+  FROM (
+    SELECT u.value, r AS rec, COALESCE(r.id, g.id) AS target_id
+    FROM jsonb_array_elements(updates) AS u
+    CROSS JOIN LATERAL jsonb_populate_record(NULL::ai_generated_questions, u.value) AS r
+    -- Uses the unique index on generation_id
+    LEFT JOIN ai_generated_questions g
+      ON r.id IS NULL AND g.generation_id = r.generation_id
+  ) AS t
+  WHERE q.id = t.target_id
+  RETURNING q.id, q.generation_id;
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION apply_question_tag_updates(jsonb) IS
+  'Bulk-update tag and labeling columns for the questions listed in a JSONB array (matched on id or generation_id); returns updated ids';
@@ -0,0 +1,70 @@
+-- Migration: Run the raw -> prefixed curriculum tag migration in SQL
+-- Description: migrate_tags_to_prefixed.py fills curriculum_prefix_map from the
+-- CurriculumParser (raw code -> prefixed code) and then calls
+-- migrate_tags_to_prefixed() once, instead of round-tripping every question.
+-- The function returns a count rather than the changed rows: a returned list goes
+-- through PostgREST, whose max-rows setting can truncate it.
+
+-- ============================================================================
+-- CREATE curriculum_prefix_map TABLE
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS curriculum_prefix_map (
+  raw_code text PRIMARY KEY,
+  prefixed_code text NOT NULL,
+  updated_at timestamptz DEFAULT now()
+);
+
+COMMENT ON TABLE curriculum_prefix_map IS 'Raw curriculum code (e.g. "MM1") to prefixed code (e.g. "M2-MM1"), synced by migrate_tags_to_prefixed.py';
+
+-- ============================================================================
+-- CREATE migrate_tags_to_prefixed FUNCTION
+-- ============================================================================
+
+-- Rewrites raw primary_tag / secondary_tags values that have an entry in
+-- curriculum_prefix_map; raw codes without an entry are left as they are.
+-- Returns the number of questions that change (or would change, with dry_run = true).
+CREATE OR REPLACE FUNCTION migrate_tags_to_prefixed(dry_run boolean DEFAULT false)
+RETURNS integer AS $$
+  WITH candidates AS (
+    SELECT
+      q.id,
+      q.primary_tag AS old_primary,
+      q.secondary_tags AS old_secondary,
+      COALESCE(pm.prefixed_code, q.primary_tag) AS new_primary,
+      CASE
+        WHEN jsonb_typeof(q.secondary_tags) = 'array' THEN (
+          SELECT COALESCE(
+            jsonb_agg(COALESCE(to_jsonb(sm.prefixed_code), tag.value) ORDER BY tag.ordinality),
+            '[]'::jsonb
+          )
+          FROM jsonb_array_elements(q.secondary_tags) WITH ORDINALITY AS tag(value, ordinality)
+          LEFT JOIN curriculum_prefix_map sm
+            ON jsonb_typeof(tag.value) = 'string' AND sm.raw_code = tag.value #>> '{}'
+        )
+        ELSE q.secondary_tags
+      END AS new_secondary
+    FROM ai_generated_questions q
+    LEFT JOIN curriculum_prefix_map pm ON pm.raw_code = q.primary_tag
+    WHERE (q.primary_tag <> '' AND position('-' in q.primary_tag) = 0)
+       OR has_raw_curriculum_tag(q.secondary_tags)
+  ),
+  changed AS (
+    SELECT c.id, c.new_primary, c.new_secondary
+    FROM candidates c
+    WHERE c.new_primary IS DISTINCT FROM c.old_primary
+       OR c.new_secondary IS DISTINCT FROM c.old_secondary
+  ),
+  updated AS (
+    UPDATE ai_generated_questions q
+    SET primary_tag = ch.new_primary,
+        secondary_tags = ch.new_secondary
+    FROM changed ch
+    WHERE q.id = ch.id AND NOT dry_run
+    RETURNING q.id
+  )
+  SELECT count(*)::integer FROM changed;
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION migrate_tags_to_prefixed(boolean) IS
+  'Prefix raw curriculum tags using curriculum_prefix_map; returns the number of changed questions';